@@ -168,7 +168,19 @@ const ARUI = (() => {
  * Module: Charts
  * ========================================================================== */
 const ARCHART = (() => {
-    function buildBalancesBar(ctx, bucketData, mode) {
+    /** Reuse a live chart of the same type (swap data/options, no animation); else create one */
+    function upsert(existing, ctx, config) {
+        if (existing && existing.config && existing.config.type === config.type && existing.canvas === ctx) {
+            existing.data = config.data;
+            existing.options = config.options;
+            existing.update('none');
+            return existing;
+        }
+        ARU.safeDestroy(existing);
+        return new Chart(ctx, config);
+    }
+
+    function buildBalancesBar(ctx, bucketData, mode, existing) {
         const items = bucketData.customers;
         const labels = items.map((_, i) => 'C' + (i + 1));
 
@@ -188,7 +200,7 @@ const ARCHART = (() => {
 
         if (mode === 'totals') {
             const totals = items.map((_, idx) => window.AR_BUCKETS.reduce((s, b) => s + Number((bucketData.data[b] || [])[idx] || 0), 0));
-            return new Chart(ctx, {
+            return upsert(existing, ctx, {
                 type: 'bar', data: {
                     labels, datasets: [{
                         label: 'Total Balance', data: totals, backgroundColor: window.AR_PALETTE[0], borderWidth: 0
@@ -218,7 +230,7 @@ const ARCHART = (() => {
         }));
         const datasets = ARU.filterZeroBucketsForStacked(datasetsRaw);
 
-        return new Chart(ctx, {
+        return upsert(existing, ctx, {
             type: 'bar', data: {labels, datasets}, options: {
                 responsive: true, maintainAspectRatio: false, plugins: {
                     legend: {position: 'bottom'}, tooltip: {
@@ -236,7 +248,7 @@ const ARCHART = (() => {
     }
 
     /** Aging pie — hide zero-amount buckets and keep consistent colors; clicking a slice applies ONLY the bucket filter */
-    function buildPie(ctx, agingSummary) {
+    function buildPie(ctx, agingSummary, existing) {
         const labels = agingSummary.map(r => r.bucket);
         const data = agingSummary.map(r => Number(r.amount || 0));
 
@@ -246,7 +258,7 @@ const ARCHART = (() => {
         const fdata = pairs.map(p => p.v);
         const colors = flabels.map(l => window.AR_BUCKET_COLORS[l] || window.AR_PALETTE[0]);
 
-        return new Chart(ctx, {
+        return upsert(existing, ctx, {
             type: 'pie', data: {labels: flabels, datasets: [{data: fdata, backgroundColor: colors}]}, options: {
                 responsive: true, maintainAspectRatio: false, plugins: {
                     legend: {position: 'bottom'},
@@ -262,10 +274,10 @@ const ARCHART = (() => {
     }
 
     /** Overdue risk: single vivid color; sums overdue only; sort by overdue amount */
-    function buildRiskBar(ctx, riskTop) {
+    function buildRiskBar(ctx, riskTop, existing) {
         const labels = riskTop.map(r => r.customer || r['Customer'] || 'Unknown');
         const data = riskTop.map(r => Number(r.overdue_amount || 0));
-        return new Chart(ctx, {
+        return upsert(existing, ctx, {
             type: 'bar', data: {
                 labels, datasets: [{
                     label: 'Overdue Amount',
@@ -301,6 +313,9 @@ const ARCHART = (() => {
  * Module: Tables
  * ========================================================================== */
 const ARTABLE = (() => {
+    const DETAIL_VIEWPORT_PX = 520; // visible height of the detail table
+    const DETAIL_OVERSCAN = 4; // Scroller buffer, in viewports' worth of rows
+
     function fillAgingTable(tbl, agingSummary, total) {
         if (!tbl) return;
 
@@ -338,11 +353,12 @@ const ARTABLE = (() => {
     }
 
 
-    /** Invoice detail table w/ default sort on Open Balance desc and $ formatting */
+    /**
+     * Invoice detail table w/ default sort on Open Balance desc and $ formatting.
+     * Virtualized: deferRender + Scroller keep only the visible rows (plus a small buffer) in the DOM;
+     * sorting and search run on the data array, so DOM size is constant regardless of invoice count.
+     */
     function buildDetailTable(data) {
-        if (window._detail) $('#detailTable').DataTable().destroy();
-        $('#detailTable').empty();
-
         // Collect all keys as columns and backfill missing cells
         const cols = Array.from((data || []).reduce((set, r) => {
             Object.keys(r).forEach(k => set.add(k));
@@ -352,6 +368,16 @@ const ARTABLE = (() => {
             if (!(c in r)) r[c] = '';
         }));
 
+        // Same columns as the live table (every drill-down): swap rows in place, keep sort/scroll state
+        const colKey = cols.join('\u0001');
+        if (window._detail && window._detailCols === colKey) {
+            window._detail.clear().rows.add(data || []).draw();
+            return;
+        }
+        if (window._detail) $('#detailTable').DataTable().destroy();
+        $('#detailTable').empty();
+        window._detailCols = colKey;
+
         const obIdx = cols.indexOf('Open Balance');
 
         // Build column definitions; format Open Balance as $ for display
@@ -367,11 +393,14 @@ const ARTABLE = (() => {
             return {title: k, data: k};
         });
 
-        window._detail = $('#detailTable').DataTable({
+        window._detail = $('#detailTable').addClass('nowrap').DataTable({
             data: data || [],
             destroy: true,
             responsive: true,
-            pageLength: 25,
+            deferRender: true,
+            scrollY: DETAIL_VIEWPORT_PX,
+            scrollCollapse: true,
+            scroller: {displayBuffer: DETAIL_OVERSCAN, boundaryScale: 0.5},
             order: obIdx >= 0 ? [[obIdx, 'desc']] : [],
             columns: columnDefs
         });
@@ -381,6 +410,46 @@ const ARTABLE = (() => {
     return {fillAgingTable, buildDetailTable};
 })();
 
+/* ==========================================================================
+ * Module: Filter indexes (built once per loaded payload)
+ * ========================================================================== */
+const ARINDEX = (() => {
+    const cache = new WeakMap();
+
+    /** customer -> row offsets, bucket -> row offsets, customer -> {bucket: total}; one pass over detail */
+    function build(detail) {
+        const byCustomer = new Map();
+        const byBucket = new Map();
+        const custBucketTotals = new Map();
+        for (let i = 0; i < detail.length; i++) {
+            const r = detail[i];
+            const c = r.Customer || '';
+            const b = r['Aging Bucket'] || '';
+            if (!byCustomer.has(c)) {
+                byCustomer.set(c, []);
+                custBucketTotals.set(c, {});
+            }
+            byCustomer.get(c).push(i);
+            if (!byBucket.has(b)) byBucket.set(b, []);
+            byBucket.get(b).push(i);
+            const t = custBucketTotals.get(c);
+            t[b] = (t[b] || 0) + Number(r['Open Balance'] || 0);
+        }
+        return {byCustomer, byBucket, custBucketTotals};
+    }
+
+    /** Index for a payload (memoized on the payload object) */
+    function forPayload(payload) {
+        if (!cache.has(payload)) cache.set(payload, build(payload.invoice_detail || []));
+        return cache.get(payload);
+    }
+
+    /** Gather rows by offset: O(matching rows) */
+    const rowsAt = (detail, offsets) => (offsets || []).map(i => detail[i]);
+
+    return {forPayload, rowsAt};
+})();
+
 /* ==========================================================================
  * Module: Aggregation + Filtering
  * ========================================================================== */
@@ -505,22 +574,16 @@ function buildAll(payload) {
     // badges
     ARUI.updateBadges(payload);
 
-    // destroy old charts
-    ARU.safeDestroy(window._stacked);
-    ARU.safeDestroy(window._pie);
-    ARU.safeDestroy(window._risk);
-
     // totals toggle (default view only)
     const toggleState = ARUI.syncTotalsToggle((newMode) => {
-        // Rebuild balances bar only, using current payload
-        ARU.safeDestroy(window._stacked);
-        window._stacked = ARCHART.buildBalancesBar(document.getElementById('stackedBar'), window.CURRENT_PAYLOAD.cust_bucket, newMode);
+        // Redraw balances bar only, using current payload
+        window._stacked = ARCHART.buildBalancesBar(document.getElementById('stackedBar'), window.CURRENT_PAYLOAD.cust_bucket, newMode, window._stacked);
     });
 
-    // build charts
-    window._stacked = ARCHART.buildBalancesBar(document.getElementById('stackedBar'), payload.cust_bucket, toggleState.mode);
-    window._pie = ARCHART.buildPie(document.getElementById('agingPie'), payload.aging_summary);
-    window._risk = ARCHART.buildRiskBar(document.getElementById('riskBar'), payload.risk_top);
+    // charts: existing instances get new data/options in place
+    window._stacked = ARCHART.buildBalancesBar(document.getElementById('stackedBar'), payload.cust_bucket, toggleState.mode, window._stacked);
+    window._pie = ARCHART.buildPie(document.getElementById('agingPie'), payload.aging_summary, window._pie);
+    window._risk = ARCHART.buildRiskBar(document.getElementById('riskBar'), payload.risk_top, window._risk);
 
     // tables
     ARTABLE.fillAgingTable(document.getElementById('agingTable'), payload.aging_summary, payload.totals.total_ar);
@@ -560,13 +623,30 @@ function setCustomerFilter(customerName) {
     }
 
     window.ACTIVE_CUSTOMER = customerName;
-    // Start from ORIGINAL rows, filter to customer only
-    const rows = window.ORIGINAL_PAYLOAD.invoice_detail.filter(r => (r.Customer || '') === customerName);
-
-    const payload = ARAGG.aggregateFromDetail(rows);
+    // Customer's rows + bucket totals straight from the index (no scan of the full detail)
+    const idx = ARINDEX.forPayload(window.ORIGINAL_PAYLOAD);
+    const rows = ARINDEX.rowsAt(window.ORIGINAL_PAYLOAD.invoice_detail, idx.byCustomer.get(customerName));
+    const bt = idx.custBucketTotals.get(customerName) || {};
+
+    const aging = window.AR_BUCKETS.slice();
+    const total_ar = aging.reduce((a, b) => a + (bt[b] || 0), 0);
+    const current_total = bt['Current'] || 0;
     const charts = ARAGG.buildInvoiceChartsForCustomer(rows);
-    payload.cust_bucket = charts.cust_bucket;
-    payload.risk_top = charts.risk_top;
+    const payload = {
+        as_of: window.ORIGINAL_PAYLOAD.as_of,
+        totals: {
+            total_ar,
+            current_total,
+            overdue_total: total_ar - current_total,
+            over_90: (bt['91–120'] || 0) + (bt['120+'] || 0),
+            customers_overdue: charts.risk_top.length ? 1 : 0,
+            invoices_overdue: rows.filter(r => r['Aging Bucket'] !== 'Current').length
+        },
+        aging_summary: aging.map(b => ({bucket: b, amount: bt[b] || 0})),
+        cust_bucket: charts.cust_bucket,
+        risk_top: charts.risk_top,
+        invoice_detail: rows
+    };
 
     const badge = document.getElementById('activeFilter');
     if (badge) {
@@ -590,7 +670,8 @@ function setBucketFilter(bucketName) {
     }
 
     window.ACTIVE_BUCKET = bucketName;
-    const rows = window.ORIGINAL_PAYLOAD.invoice_detail.filter(r => (r['Aging Bucket'] || '') === bucketName);
+    const idx = ARINDEX.forPayload(window.ORIGINAL_PAYLOAD);
+    const rows = ARINDEX.rowsAt(window.ORIGINAL_PAYLOAD.invoice_detail, idx.byBucket.get(bucketName));
 
     const payload = ARAGG.aggregateFromDetail(rows);
 
@@ -610,25 +691,41 @@ document.addEventListener('click', (e) => {
 });
 
 /* ==========================================================================
- * Module: CSV -> Payload
+ * Module: CSV -> Payload (single pass; runs inside a Web Worker when possible)
  * ========================================================================== */
-function toPayloadFromCSV(rows) {
-    if (!rows || rows.length === 0) return null;
-    const headers = Object.keys(rows[0] || {});
-    const cols = headers.map(h => String(h).trim().toLowerCase());
-
-    const find = (...names) => {
-        for (let i = 0; i < cols.length; i++) if (names.includes(cols[i])) return headers[i];
-        return null;
-    };
-
-    const c_customer = find('customer', 'name', 'customer_name');
-    const c_type = find('type', 'transaction_type');
-    const c_txn = find('date', 'txn_date', 'transaction_date', 'invoice_date');
-    const c_due = find('due date', 'due_date', 'duedate');
-    const c_num = find('num', 'no', 'invoice_number', 'doc_num', 'txn_no');
-    const c_bal = find('open balance', 'open_balance', 'open amount', 'openamount', 'open_amt', 'amount due', 'amount_due', 'balance', 'amount', 'amt');
-    const c_memo = find('memo', 'description', 'memo/description', 'memo_description');
+/**
+ * One-pass fold of raw CSV rows into the dashboard payload.
+ * Self-contained on purpose: its source is shipped into the worker, so no globals/closures.
+ * Same column matching, filtering and buckets as before; every aggregate is updated per row.
+ */
+function createCsvAccumulator(buckets, todayMs) {
+    const today = new Date(todayMs);
+    const over90 = ['91–120', '120+'];
+    const skipTypes = ['payment', 'deposit', 'journal', 'total', 'subtotal', 'refund'];
+    let cols = null;
+
+    const detail = [];
+    let total_ar = 0, current_total = 0, over_90 = 0, invoices_overdue = 0;
+    const aging_map = new Map(buckets.map(b => [b, 0]));
+    const byCust = new Map();
+    const riskMap = new Map();
+
+    function resolveColumns(headers) {
+        const lower = headers.map(h => String(h).trim().toLowerCase());
+        const find = (...names) => {
+            for (let i = 0; i < lower.length; i++) if (names.includes(lower[i])) return headers[i];
+            return null;
+        };
+        return {
+            customer: find('customer', 'name', 'customer_name'),
+            type: find('type', 'transaction_type'),
+            txn: find('date', 'txn_date', 'transaction_date', 'invoice_date'),
+            due: find('due date', 'due_date', 'duedate'),
+            num: find('num', 'no', 'invoice_number', 'doc_num', 'txn_no'),
+            bal: find('open balance', 'open_balance', 'open amount', 'openamount', 'open_amt', 'amount due', 'amount_due', 'balance', 'amount', 'amt'),
+            memo: find('memo', 'description', 'memo/description', 'memo_description'),
+        };
+    }
 
     const toNum = (x) => {
         const n = Number(String(x || '').replace(/[^0-9\.-]/g, ''));
@@ -639,56 +736,239 @@ function toPayloadFromCSV(rows) {
         return isNaN(d) ? null : d;
     };
 
-    const today = new Date();
-    const rowsFiltered = rows
-        .filter(r => {
-            const t = String(r[c_type] || '').toLowerCase();
-            if (!t) return false;
-            if (['payment', 'deposit', 'journal', 'total', 'subtotal', 'refund'].includes(t)) return false;
-            // Keep invoices and credit memos
-            return t.includes('inv') || t === 'invoice' || t.includes('credit');
-        })
-        .filter(r => String(r[c_customer] || '').trim().length > 0);
-
-    const detail = rowsFiltered.map(r => {
-        const due = parseDate(r[c_due]);
+    function add(r) {
+        if (!cols) cols = resolveColumns(Object.keys(r || {}));
+        const t = String(r[cols.type] || '').toLowerCase();
+        if (!t || skipTypes.includes(t)) return;
+        // Keep invoices and credit memos
+        if (!(t.includes('inv') || t.includes('credit'))) return;
+        if (String(r[cols.customer] || '').trim().length === 0) return;
+
+        const due = parseDate(r[cols.due]);
         const days = due ? Math.floor((today - due) / (1000 * 60 * 60 * 24)) : 0;
         const bucket = days <= 0 ? 'Current' : days <= 30 ? '1–30' : days <= 60 ? '31–60' : days <= 90 ? '61–90' : days <= 120 ? '91–120' : '120+';
+        const amt = toNum(r[cols.bal]);
+        const c = r[cols.customer];
         const rec = {
-            Customer: r[c_customer],
-            Type: (String(r[c_type] || '').toLowerCase().includes('credit') ? 'Credit Memo' : 'Invoice'),
-            'Open Balance': toNum(r[c_bal]),
+            Customer: c,
+            Type: (t.includes('credit') ? 'Credit Memo' : 'Invoice'),
+            'Open Balance': amt,
             'Days Past Due': days,
             'Aging Bucket': bucket
         };
-        if (c_txn) rec['Date'] = r[c_txn];
-        if (c_due) rec['Due Date'] = r[c_due];
-        if (c_num) rec['Invoice Number'] = r[c_num];
-        if (c_memo) rec['Memo'] = r[c_memo];
-        return rec;
-    });
+        if (cols.txn) rec['Date'] = r[cols.txn];
+        if (cols.due) rec['Due Date'] = r[cols.due];
+        if (cols.num) rec['Invoice Number'] = r[cols.num];
+        if (cols.memo) rec['Memo'] = r[cols.memo];
+        detail.push(rec);
+
+        // Fold every aggregate in the same pass
+        total_ar += amt;
+        if (bucket === 'Current') current_total += amt;
+        if (over90.includes(bucket)) over_90 += amt;
+        aging_map.set(bucket, (aging_map.get(bucket) || 0) + amt);
+
+        if (!byCust.has(c)) byCust.set(c, {});
+        const obj = byCust.get(c);
+        obj[bucket] = (obj[bucket] || 0) + amt;
+
+        if (bucket !== 'Current') {
+            invoices_overdue += 1;
+            if (!riskMap.has(c)) riskMap.set(c, {customer: c, overdue_amount: 0, max_days_past_due: 0, invoices: 0});
+            const o = riskMap.get(c);
+            o.overdue_amount += amt; // credits reduce overdue
+            o.max_days_past_due = Math.max(o.max_days_past_due, days);
+            o.invoices += 1;
+        }
+    }
+
+    function finish() {
+        if (!detail.length && !cols) return null;
+        const custTotals = Array.from(byCust.entries()).map(([k, v]) => [k, buckets.reduce((a, b) => a + (v[b] || 0), 0)]);
+        custTotals.sort((a, b) => b[1] - a[1]);
+        const top = custTotals.slice(0, 20).map(([k]) => k);
+        const data = Object.fromEntries(buckets.map(b => [b, top.map(c => (byCust.get(c) || {})[b] || 0)]));
 
-    return ARAGG.aggregateFromDetail(detail);
+        // overdue risk: overdue only, top 15 customers
+        const risk = Array.from(riskMap.values()).map(r => ({...r, overdue_amount: Math.max(r.overdue_amount, 0)}))
+            .sort((a, b) => b.overdue_amount - a.overdue_amount).slice(0, 15);
+
+        return {
+            as_of: today.toISOString().slice(0, 10),
+            totals: {
+                total_ar,
+                current_total,
+                overdue_total: total_ar - current_total,
+                over_90,
+                customers_overdue: risk.length,
+                invoices_overdue
+            },
+            aging_summary: buckets.map(b => ({bucket: b, amount: aging_map.get(b) || 0})),
+            cust_bucket: {customers: top, buckets: buckets.slice(), data},
+            risk_top: risk,
+            invoice_detail: detail
+        };
+    }
+
+    return {add, finish};
+}
+
+const ARSTREAM = (() => {
+    const PAPA_URL = 'https://cdn.jsdelivr.net/npm/papaparse@5.4.1/papaparse.min.js';
+    const PARSE_OPTS = {header: true, dynamicTyping: false, skipEmptyLines: 'greedy'};
+
+    // Worker body: stream-parse the file in chunks, fold rows, post back only the finished payload
+    const WORKER_SRC = `importScripts(${JSON.stringify(PAPA_URL)});
+const createCsvAccumulator = ${createCsvAccumulator.toString()};
+const PARSE_OPTS = ${JSON.stringify(PARSE_OPTS)};
+onmessage = (e) => {
+    const acc = createCsvAccumulator(e.data.buckets, e.data.todayMs);
+    Papa.parse(e.data.file, Object.assign({}, PARSE_OPTS, {
+        chunk: (res) => { for (const r of res.data) acc.add(r); },
+        complete: () => postMessage({payload: acc.finish()}),
+        error: (err) => postMessage({error: String(err && err.message || err)}),
+    }));
+};`;
+
+    function makeWorker() {
+        try {
+            const url = URL.createObjectURL(new Blob([WORKER_SRC], {type: 'text/javascript'}));
+            const w = new Worker(url);
+            URL.revokeObjectURL(url);
+            return w;
+        } catch (_) {
+            return null; // e.g. workers blocked: fall back to chunked parsing on the main thread
+        }
+    }
+
+    function parseOnMainThread(file, buckets, todayMs) {
+        return new Promise((resolve, reject) => {
+            const acc = createCsvAccumulator(buckets, todayMs);
+            Papa.parse(file, {
+                ...PARSE_OPTS,
+                chunk: (res) => res.data.forEach(acc.add),
+                complete: () => resolve(acc.finish()),
+                error: reject,
+            });
+        });
+    }
+
+    /** File -> payload via one linear scan; resolves null when no rows could be read */
+    function parseFile(file) {
+        const buckets = window.AR_BUCKETS.slice();
+        const todayMs = Date.now();
+        const worker = makeWorker();
+        if (!worker) return parseOnMainThread(file, buckets, todayMs);
+        return new Promise((resolve, reject) => {
+            worker.onmessage = (e) => {
+                worker.terminate();
+                e.data.error ? reject(new Error(e.data.error)) : resolve(e.data.payload);
+            };
+            worker.onerror = (e) => {
+                worker.terminate();
+                e.preventDefault();
+                parseOnMainThread(file, buckets, todayMs).then(resolve, reject);
+            };
+            worker.postMessage({file, buckets, todayMs});
+        });
+    }
+
+    return {parseFile};
+})();
+
+/* ==========================================================================
+ * Module: Precomputed payload (dashboard_payload.json written by statements.py)
+ * ========================================================================== */
+const ARPAYLOAD = (() => {
+    // statements.py writes Customer_Statements/ next to Dashboard/ when run from the project root
+    const PAYLOAD_URL = '../Customer_Statements/dashboard_payload.json';
+
+    // config.py labels use a hyphen ('1-30'); the dashboard keys colors/labels by en dash ('1–30')
+    const toDashBucket = (b) => String(b || '').replace('-', '–');
+
+    /** Columnar invoice_detail -> row objects (dictionary-encoded columns are {values, codes}) */
+    function decodeDetail(detail) {
+        const cols = detail.columns || {};
+        const names = Object.keys(cols);
+        const rows = new Array(detail.rows || 0);
+        for (let i = 0; i < rows.length; i++) {
+            const r = {};
+            for (const k of names) {
+                const c = cols[k];
+                r[k] = Array.isArray(c) ? c[i] : c.values[c.codes[i]];
+            }
+            rows[i] = r;
+        }
+        return rows;
+    }
+
+    /** Precomputed payload -> the shape buildAll() renders; no aggregation happens here */
+    function fromPrecomputed(p) {
+        const cols = p.invoice_detail.columns;
+        cols['Aging Bucket'] = {...cols['Aging Bucket'], values: cols['Aging Bucket'].values.map(toDashBucket)};
+        const data = p.cust_bucket.data || {};
+        return {
+            as_of: p.as_of,
+            totals: p.totals,
+            aging_summary: p.aging_summary.map(r => ({...r, bucket: toDashBucket(r.bucket)})),
+            cust_bucket: {
+                customers: p.cust_bucket.customers,
+                buckets: p.cust_bucket.buckets.map(toDashBucket),
+                data: Object.fromEntries(Object.keys(data).map(b => [toDashBucket(b), data[b]])),
+            },
+            risk_top: p.risk_top,
+            invoice_detail: decodeDetail(p.invoice_detail),
+        };
+    }
+
+    /** Try the payload next to the statements (works when the folder is served over http) */
+    async function tryAutoLoad() {
+        try {
+            const res = await fetch(PAYLOAD_URL, {cache: 'no-store'});
+            return res.ok ? fromPrecomputed(await res.json()) : null;
+        } catch (_) {
+            return null;
+        }
+    }
+
+    return {fromPrecomputed, tryAutoLoad};
+})();
+
+/** Show a freshly loaded dataset from scratch (drops filters from any previous file) */
+function loadPayload(payload) {
+    window.ORIGINAL_PAYLOAD = null;
+    window.ACTIVE_CUSTOMER = null;
+    window.ACTIVE_BUCKET = null;
+    ARINDEX.forPayload(payload); // drill-down indexes, built once per dataset
+    buildAll(payload);
 }
 
 /* ==========================================================================
  * File upload bootstrap
  * ========================================================================== */
 document.addEventListener('DOMContentLoaded', function () {
+    ARPAYLOAD.tryAutoLoad().then(payload => {
+        if (payload && !window.CURRENT_PAYLOAD) loadPayload(payload);
+    });
+
     const input = document.getElementById('fileInput');
     if (!input) return;
     input.addEventListener('change', (e) => {
         const file = e.target.files[0];
         if (!file) return;
-        Papa.parse(file, {
-            header: true, dynamicTyping: false, skipEmptyLines: 'greedy', complete: (res) => {
-                const payload = toPayloadFromCSV(res.data);
-                if (!payload) {
-                    alert('Could not read any rows from the CSV.');
-                    return;
-                }
-                buildAll(payload);
+        // Precomputed payload from statements.py: parse JSON only
+        if (file.name.toLowerCase().endsWith('.json')) {
+            file.text().then(text => loadPayload(ARPAYLOAD.fromPrecomputed(JSON.parse(text))))
+                .catch(() => alert('Could not read dashboard_payload.json.'));
+            return;
+        }
+        // Raw CSV: streamed + aggregated off the main thread
+        ARSTREAM.parseFile(file).then(payload => {
+            if (!payload) {
+                alert('Could not read any rows from the CSV.');
+                return;
             }
-        });
+            loadPayload(payload);
+        }).catch(() => alert('Could not read the CSV.'));
     });
 });
@@ -0,0 +1,162 @@
+"""
+Multi-entity batch runs: `python statements.py [build options] batch entities.json` builds statements for
+several branches/locations, each with its own branding, export and output root, in one invocation.
+
+entities.json is a list of jobs (paths relative to the file; "company" overrides config.Company fields):
+    [{"entity": "Exeter", "export": "exports/exeter_ar_aging.csv", "output": "Exeter/Customer_Statements",
+      "company": {"name": "New England Truck Center - Exeter", "phone": "(603) 778-8158"}}, ...]
+
+Entities are built in --processes worker processes, largest export first. Each worker imports pandas once
+and keeps one compiled template environment (bytecode shared in <summary root>/.cache/jinja) for every
+entity it builds. Each entity keeps its own manifest, ingest cache and history under its output root.
+<summary root>/index.html and _batch_summary.json consolidate the run across entities.
+"""
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+
+import statements
+from config import BUCKET_CANON, Company
+from utils import fmt_money
+
+BATCH_SUMMARY_NAME = "_batch_summary.json"
+TOTAL_KEYS = [*BUCKET_CANON, "Total Due", "Overdue Total"]
+
+
+@dataclass
+class EntityJob:
+    entity: str
+    export: Path
+    output_root: Path
+    company: Company = field(default_factory=Company)
+
+
+def load_jobs(path: Path) -> list[EntityJob]:
+    """Jobs from a batch file: a JSON list of {"entity", "export", "output", "company"}.
+    entity defaults to the company name; export and output are required."""
+    base = path.resolve().parent
+    try:
+        items = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as err:
+        raise SystemExit(f"Can't read batch file {path}: {err}")
+    jobs = []
+    for i, item in enumerate(items, 1):
+        try:
+            company = Company(**item.get("company", {}))
+            jobs.append(EntityJob(entity=item.get("entity") or company.name, export=base / item["export"],
+                                  output_root=(base / item["output"]).resolve(), company=company))
+        except (KeyError, TypeError) as err:
+            raise SystemExit(f"Batch job {i} in {path} is invalid: {err!r}")
+    roots = [job.output_root for job in jobs]
+    if len(set(roots)) < len(roots):
+        raise SystemExit(f"Every entity in {path} needs its own output root.")
+    return jobs
+
+
+def _build_entity(job: EntityJob, options: dict) -> dict:
+    """One entity's build_all (in a pool worker or in-process) -> summary row; its output is captured."""
+    log = io.StringIO()
+    report, error = None, None
+    t0 = time.perf_counter()
+    with redirect_stdout(log):
+        try:
+            report = statements.build_all(input_csv=job.export, company=job.company,
+                                          output_root=job.output_root, **options)
+        except (SystemExit, Exception) as err:  # one bad export shouldn't stop the other entities
+            error = f"{type(err).__name__}: {err}"
+    row = {
+        "entity": job.entity, "company": job.company.name,
+        "export": str(job.export), "output": str(job.output_root),
+        "ok": error is None, "error": error, "seconds": round(time.perf_counter() - t0, 3), "log": log.getvalue(),
+    }
+    if report:
+        bundle = options.get("bundle")
+        row.update(as_of=report.as_of.isoformat(), customers=report.counts["customers"],
+                   totals=report.totals, counts=report.counts,
+                   index=str(statements.bundle_path(job.output_root, report.as_of, bundle) if bundle
+                             else job.output_root / "index.html"))
+    return row
+
+
+def run_batch(jobs: list[EntityJob], summary_root: Path, processes: int = 1, **options) -> list[dict]:
+    """Build every entity with build_all(**options) in `processes` workers (1 = in this process),
+    then write the consolidated index. Returns one summary row per job, in job order."""
+    summary_root = summary_root.resolve()
+    options["template_cache"] = summary_root / statements.TEMPLATE_CACHE_DIR
+    order = sorted(range(len(jobs)), key=lambda i: _size(jobs[i].export), reverse=True)  # biggest first
+    rows: list[dict | None] = [None] * len(jobs)
+    t0 = time.perf_counter()
+    if processes <= 1:
+        for i in order:
+            rows[i] = _report(_build_entity(jobs[i], options))
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = {pool.submit(_build_entity, jobs[i], options): i for i in order}
+            for fut in as_completed(futures):
+                rows[futures[fut]] = _report(fut.result())
+    wall = time.perf_counter() - t0
+
+    path = write_summary(rows, summary_root, date.today(), wall, processes)
+    ok = [r for r in rows if r["ok"]]
+    customers = sum(r["customers"] for r in ok)
+    busy = sum(r["seconds"] for r in rows)
+    print(f"✅ Built {len(ok)}/{len(rows)} entities ({customers} customers) in {wall:.1f}s "
+          f"with --processes {processes} ({len(rows) / wall:.2f} entities/s, "
+          f"{busy / wall:.1f}x the summed per-entity build time)")
+    print(f"   All entities: {fmt_money(sum(r['totals']['Total Due'] for r in ok))} due")
+    print(f"   Open: {path}")
+    return rows
+
+
+def _size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+def _report(row: dict) -> dict:
+    """Print one finished entity's captured build output under a header line."""
+    status = "✅" if row["ok"] else "❌"
+    print(f"{status} [{row['entity']}] {row['seconds']:.1f}s")
+    for line in row["log"].splitlines():
+        print(f"   {line}")
+    if row["error"]:
+        print(f"   {row['error']}")
+    return row
+
+
+def write_summary(rows: list[dict], summary_root: Path, as_of: date, wall: float, processes: int) -> Path:
+    """Consolidated cross-entity index.html + _batch_summary.json in summary_root; returns the index path."""
+    summary_root.mkdir(parents=True, exist_ok=True)
+    ok = [r for r in rows if r["ok"]]
+    grand = {
+        "customers": sum(r["customers"] for r in ok),
+        "totals": {k: round(sum(r["totals"][k] for r in ok), 2) for k in TOTAL_KEYS},
+        "seconds": round(wall, 3),
+    }
+    data = {"as_of": as_of.isoformat(), "processes": processes, "entities": len(rows), "failed": len(rows) - len(ok),
+            "all": grand, "results": [{k: v for k, v in r.items() if k != "log"} for r in rows]}
+    (summary_root / BATCH_SUMMARY_NAME).write_text(json.dumps(data, indent=2), encoding="utf-8")
+
+    entities = []
+    for r in rows:
+        e = dict(r)
+        if r["ok"]:
+            e["totals_fmt"] = {k: fmt_money(r["totals"][k]) for k in TOTAL_KEYS}
+            e["link"] = os.path.relpath(r["index"], summary_root).replace("\\", "/")
+        entities.append(e)
+    index = summary_root / "index.html"
+    env = statements._jinja_env(summary_root / statements.TEMPLATE_CACHE_DIR)
+    with open(index, "w", encoding="utf-8") as f:
+        env.get_template("batch.html").stream(
+            as_of=as_of.isoformat(), buckets=BUCKET_CANON, entities=entities,
+            grand={**grand, "totals_fmt": {k: fmt_money(v) for k, v in grand["totals"].items()}},
+        ).dump(f)
+    return index
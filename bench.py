@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark: synthetic QuickBooks AR Aging Detail exports + per-phase timings of the build.
+Run with: python bench.py [--rows 1000 100000 1000000] [--customers N] [--json out.json]
+      or: python bench.py --layouts [--rows ...]  (folder tree vs --bundle zip/tar: wall time + files written)
+
+The generator follows the first-choice column names in utils.ALIASES and QuickBooks quirks:
+money strings with "$"/commas, credit memos, payments, section headers, "Total ..." subtotal
+lines and blank rows (all of which the strict filters must reject).
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import statements
+from bundle import BUNDLE_FORMATS
+from config import BUCKET_CANON, Company
+from utils import ALIASES
+
+# First alias of each column = what QuickBooks writes
+_COL = {k: v[0] for k, v in ALIASES.items()}
+_TERMS = {"Net 30": 30, "Net 15": 15, "Net 60": 60, "Due on receipt": 0}
+_SUFFIXES = ["Trucking", "Logistics LLC", "Fleet Services", "Hauling & Sons", "Transport Inc.", "Excavating"]
+
+
+def make_export(path: Path, rows: int = 1000, customers: int | None = None, seed: int = 0,
+                as_of: date | None = None, junk: float = 0.1) -> Path:
+    """Write a synthetic AR Aging Detail CSV with about `rows` lines (junk = share of non-detail lines)."""
+    rng = np.random.default_rng(seed)
+    as_of = pd.Timestamp(as_of or date.today())
+    customers = customers or max(1, rows // 20)
+    n_junk = int(rows * junk)
+    n = rows - n_junk
+
+    names = np.array([f"Customer {i:05d} {_SUFFIXES[i % len(_SUFFIXES)]}" for i in range(customers)], dtype=object)
+    credit = rng.random(n) < 0.08
+    terms = rng.choice(list(_TERMS), n)
+    inv_date = as_of - pd.to_timedelta(rng.integers(0, 400, n), unit="D")
+    due = inv_date + pd.to_timedelta(pd.Series(terms).map(_TERMS).to_numpy(), unit="D")
+    aging = (as_of - due).days.to_numpy()
+    amount = np.round(rng.lognormal(6.5, 1.2, n), 2) * np.where(credit, -1, 1)
+    style = rng.integers(0, 3, n)
+    money = np.where(style == 0, [f"{a:,.2f}" for a in amount],
+                     np.where(style == 1, [f"${a:,.2f}" for a in amount], [f"{a:.2f}" for a in amount]))
+
+    detail = pd.DataFrame({
+        "": "",
+        _COL["type"]: np.where(credit, "Credit Memo", "Invoice"),
+        _COL["date"]: inv_date.strftime("%m/%d/%Y"),
+        _COL["num"]: np.where(credit, "CM-", "") + pd.Series(np.arange(n) + 10000).astype(str).to_numpy(),
+        _COL["po"]: np.where(rng.random(n) < 0.4, "PO" + pd.Series(rng.integers(1000, 99999, n)).astype(str), ""),
+        _COL["name"]: names[rng.integers(0, customers, n)],
+        _COL["terms"]: terms,
+        _COL["due_date"]: due.strftime("%m/%d/%Y"),
+        _COL["aging"]: np.where(aging > 0, aging.astype(str), ""),
+        _COL["open_balance"]: money,
+    })
+
+    # Non-detail lines QuickBooks mixes in: section headers, subtotals, blanks, payments, zero lines
+    kind = rng.integers(0, 5, n_junk)
+    junk_df = pd.DataFrame({c: "" for c in detail.columns}, index=range(n_junk))
+    junk_df.loc[kind == 0, ""] = rng.choice(BUCKET_CANON, int((kind == 0).sum()))
+    junk_df.loc[kind == 1, ""] = "Total " + pd.Series(rng.choice(BUCKET_CANON, int((kind == 1).sum()))).to_numpy()
+    junk_df.loc[kind == 1, _COL["open_balance"]] = [f"{v:,.2f}" for v in rng.lognormal(10, 1, int((kind == 1).sum()))]
+    pay = kind == 3
+    junk_df.loc[pay, _COL["type"]] = "Payment"
+    junk_df.loc[pay, _COL["name"]] = names[rng.integers(0, customers, int(pay.sum()))]
+    junk_df.loc[pay, _COL["open_balance"]] = "-100.00"
+    zero = kind == 4
+    junk_df.loc[zero, _COL["type"]] = "Invoice"
+    junk_df.loc[zero, _COL["num"]] = "0"
+    junk_df.loc[zero, _COL["name"]] = names[rng.integers(0, customers, int(zero.sum()))]
+    junk_df.loc[zero, _COL["open_balance"]] = "0.00"
+
+    out = pd.concat([detail, junk_df], ignore_index=True)
+    out = out.iloc[rng.permutation(len(out))]
+    out.to_csv(path, index=False)
+    return path
+
+
+def bench_phases(csv_path: Path, out_root: Path, as_of: date, workers: int = 1) -> dict:
+    """Time each build phase separately, then the whole build_all end to end."""
+    t = {}
+    clock = time.perf_counter
+
+    t0 = clock()
+    names, cols, usecols = statements._sniff_header(csv_path)
+    [raw0] = statements._read_export(csv_path, names, usecols)
+    raw0.columns = [c.strip() for c in raw0.columns]
+    t["ingest"] = clock() - t0
+
+    t0 = clock()
+    df0 = statements._normalize(raw0, cols, as_of)
+    t["normalize"] = clock() - t0
+
+    t0 = clock()
+    keep, flags = statements._reject_reasons(df0)
+    rejects = statements._RejectLog(out_root / "_rejected_rows.csv")
+    rejects.add(df0, keep, flags)
+    rejects.finish()
+    detail = df0.loc[keep, statements._DETAIL_COLS]
+    t["filter"] = clock() - t0
+
+    t0 = clock()
+    jobs, summaries = statements._customer_jobs(detail, out_root, as_of)
+    t["aggregate"] = clock() - t0
+
+    statements._init_render(Company(), as_of)
+    render = write = 0.0
+    for job in jobs:
+        _, r, w = statements._render_customer(job)
+        render += r
+        write += w
+    t0 = clock()
+    statements._write_index(summaries, out_root, Company(), as_of)
+    t["render"] = render
+    t["write"] = write + clock() - t0
+
+    with open(os.devnull, "w") as quiet, redirect_stdout(quiet):
+        t0 = clock()
+        statements.build_all(input_csv=csv_path, output_root=csv_path.parent / "Customer_Statements",
+                             workers=workers, force=True, use_cache=False)
+        t["build_all"] = clock() - t0
+    return {"rows": len(raw0), "detail_rows": len(detail), "customers": len(jobs), "seconds": t}
+
+
+def bench_layouts(csv_path: Path, workers: int = 1) -> dict:
+    """Full build per output layout in a fresh folder: wall time, files created and bytes on disk."""
+    out = {}
+    for layout in (None, *BUNDLE_FORMATS):
+        run_dir = csv_path.parent / f"layout_{layout or 'dir'}"
+        with open(os.devnull, "w") as quiet, redirect_stdout(quiet):
+            t0 = time.perf_counter()
+            statements.build_all(input_csv=csv_path, output_root=run_dir / "Customer_Statements",
+                                 workers=workers, use_cache=False, history=False, bundle=layout)
+            wall = time.perf_counter() - t0
+        files = [p for p in (run_dir / "Customer_Statements").rglob("*") if p.is_file()]
+        out[layout or "dir"] = {"seconds": wall, "files": len(files), "bytes": sum(p.stat().st_size for p in files)}
+    return out
+
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description="Benchmark the statement build on synthetic exports.")
+    ap.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000],
+                    help="export sizes to run (e.g. 1000 100000 1000000)")
+    ap.add_argument("--customers", type=int, default=None, help="customers per export (default rows/20)")
+    ap.add_argument("--workers", type=int, default=1, help="--workers passed to the end-to-end build_all run")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--layouts", action="store_true",
+                    help="compare the folder tree with --bundle zip/tar instead of timing phases")
+    ap.add_argument("--json", type=Path, default=None, help="also write results to this JSON file")
+    args = ap.parse_args(argv)
+
+    as_of = date.today()
+    results = []
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory(prefix="ar_bench_") as tmp:
+            tmp = Path(tmp)
+            csv_path = make_export(tmp / "qb_ar_aging_detail_bench.csv", rows, args.customers, args.seed, as_of)
+            if args.layouts:
+                res = {"rows": rows, "layouts": bench_layouts(csv_path, args.workers)}
+            else:
+                out_root = tmp / "phases"
+                out_root.mkdir()
+                res = bench_phases(csv_path, out_root, as_of, args.workers)
+        results.append(res)
+        if args.layouts:
+            for name, r in res["layouts"].items():
+                print(f"{rows:>9,} rows  {name:>4}  {r['seconds']:7.3f}s  {r['files']:>7,} files  "
+                      f"{r['bytes'] / 1e6:8.1f} MB")
+            continue
+        secs = "  ".join(f"{k}={v:.3f}s" for k, v in res["seconds"].items())
+        print(f"{res['rows']:>9,} rows  {res['customers']:>6,} customers  {secs}")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Single-archive output: `python statements.py --bundle {zip,tar}` streams the whole run (statements,
+email templates, index, dashboard payload, rejected rows) into one archive instead of thousands of
+loose files. Member paths mirror the directory layout under Customer_Statements.
+
+The archive is written to <name>.tmp next to its final path and renamed into place only when the run
+finishes, so a crashed run leaves the previous archive untouched (at worst a stale .tmp, removed by the next run).
+A final _bundle_index.json member lists every member with its size and customer.
+"""
+import json
+import os
+import tarfile
+import time
+import zipfile
+from io import BytesIO
+from pathlib import Path
+
+BUNDLE_FORMATS = {"zip": ".zip", "tar": ".tar.gz"}
+BUNDLE_INDEX_NAME = "_bundle_index.json"
+
+
+class BundleWriter:
+    """Appends members to <path>.tmp; commit() writes the internal index and renames into place."""
+
+    def __init__(self, path: Path, fmt: str):
+        if fmt not in BUNDLE_FORMATS:
+            raise ValueError(f"unknown bundle format {fmt!r} (expected one of {', '.join(BUNDLE_FORMATS)})")
+        self.path = path
+        self.fmt = fmt
+        self.tmp = path.with_name(path.name + ".tmp")
+        self.tmp.unlink(missing_ok=True)
+        if fmt == "zip":
+            self.archive = zipfile.ZipFile(self.tmp, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6)
+        else:
+            self.archive = tarfile.open(self.tmp, "w:gz", compresslevel=6)
+        self.members: list[dict] = []
+        self.mtime = time.time()
+
+    def add(self, name: str, data: bytes, customer: str | None = None) -> None:
+        """One member from memory (name is '/'-separated, relative to the output root)."""
+        if self.fmt == "zip":
+            self.archive.writestr(name, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size, info.mtime = len(data), self.mtime
+            self.archive.addfile(info, BytesIO(data))
+        self.members.append({"path": name, "bytes": len(data), "customer": customer})
+
+    def add_file(self, name: str, path: Path) -> None:
+        self.add(name, path.read_bytes())
+
+    def commit(self) -> Path:
+        index = {
+            "format": self.fmt,
+            "members": self.members,
+            "customers": {m["customer"]: [] for m in self.members if m["customer"]},
+        }
+        for m in self.members:
+            if m["customer"]:
+                index["customers"][m["customer"]].append(m["path"])
+        self.add(BUNDLE_INDEX_NAME, json.dumps(index, ensure_ascii=False, indent=1).encode("utf-8"))
+        self.archive.close()
+        os.replace(self.tmp, self.path)
+        return self.path
+
+    def discard(self) -> None:
+        self.archive.close()
+        self.tmp.unlink(missing_ok=True)
@@ -0,0 +1,142 @@
+"""
+Normalized-ingest cache: reuse parsed/normalized/filtered detail rows when the same export is rebuilt.
+
+Snapshots live under <root>/<key>/ and are keyed by the CSV's path, size, mtime, content hash
+and the as-of date (plus CACHE_VERSION and the alias/bucket config). Detail frames are stored
+as Parquet when pyarrow is installed, else as pandas pickles.
+"""
+import hashlib
+import json
+import os
+import shutil
+from datetime import date
+from importlib.util import find_spec
+from pathlib import Path
+
+import pandas as pd
+
+from config import AGING_BUCKETS
+from utils import ALIASES
+
+# Bump whenever normalization/filter logic changes so old snapshots stop matching.
+CACHE_VERSION = 3
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+_FRAME_EXT = ".parquet" if find_spec("pyarrow") else ".pkl"
+
+
+def _file_hash(path: Path, block: int = 1 << 20) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(block), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def fingerprint(csv_path: Path, as_of: date) -> str:
+    """Cache key for one export + as-of date."""
+    st = csv_path.stat()
+    ident = {
+        "v": CACHE_VERSION,
+        "path": str(csv_path.resolve()),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "content": _file_hash(csv_path),
+        "as_of": as_of.isoformat(),
+        "config": [AGING_BUCKETS, ALIASES],
+    }
+    return hashlib.blake2b(json.dumps(ident, sort_keys=True).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _write_frame(df: pd.DataFrame, path: Path) -> None:
+    if path.suffix == ".parquet":
+        df.to_parquet(path)  # index kept: tie-breaks depend on original row order
+    else:
+        df.to_pickle(path)
+
+
+def _read_frame(path: Path) -> pd.DataFrame:
+    return pd.read_parquet(path) if path.suffix == ".parquet" else pd.read_pickle(path)
+
+
+def _dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.iterdir() if f.is_file())
+
+
+class SnapshotWriter:
+    """Collects detail batches for one key; nothing is visible to lookups until commit()."""
+
+    def __init__(self, cache: "IngestCache", key: str):
+        self.cache = cache
+        self.key = key
+        self.tmp = cache.root / f".{key}.tmp"
+        shutil.rmtree(self.tmp, ignore_errors=True)
+        self.tmp.mkdir(parents=True)
+        self.parts = 0
+
+    def add(self, df: pd.DataFrame) -> None:
+        _write_frame(df, self.tmp / f"detail_{self.parts:05d}{_FRAME_EXT}")
+        self.parts += 1
+
+    def commit(self, dropped: int, outputs: list[Path]) -> None:
+        """outputs: files ingest wrote beside the detail (rejected rows, their summary), kept by name."""
+        kept = [p for p in outputs if p.exists()]
+        for p in kept:
+            shutil.copyfile(p, self.tmp / f"out_{p.name}")
+        (self.tmp / "meta.json").write_text(
+            json.dumps({"dropped": dropped, "parts": self.parts, "outputs": [p.name for p in kept]}),
+            encoding="utf-8")
+        final = self.cache.root / self.key
+        shutil.rmtree(final, ignore_errors=True)
+        os.replace(self.tmp, final)
+        self.cache.evict(keep=self.key)
+
+    def discard(self) -> None:
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+class IngestCache:
+    def __init__(self, root: Path, max_bytes: int = CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def lookup(self, key: str, outputs: list[Path]) -> tuple[list, int] | None:
+        """(batch loaders, dropped) on a hit, restoring whichever of outputs the snapshot kept and deleting
+        the rest (so a previous export's file isn't left behind); None on a miss."""
+        snap = self.root / key
+        try:
+            meta = json.loads((snap / "meta.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        files = sorted(snap.glob("detail_*"))
+        if len(files) != meta["parts"] or not all((snap / f"out_{n}").exists() for n in meta["outputs"]):
+            return None
+        for p in outputs:
+            if p.name in meta["outputs"]:
+                shutil.copyfile(snap / f"out_{p.name}", p)
+            else:
+                p.unlink(missing_ok=True)
+        os.utime(snap / "meta.json")  # LRU stamp for eviction
+        return [lambda f=f: _read_frame(f) for f in files], meta["dropped"]
+
+    def writer(self, key: str) -> SnapshotWriter:
+        return SnapshotWriter(self, key)
+
+    def evict(self, keep: str | None = None) -> None:
+        """Drop least-recently-used snapshots until the cache fits in max_bytes."""
+        snaps = []
+        for d in self.root.iterdir():
+            if d.is_dir() and not d.name.startswith(".") and (d / "meta.json").exists():
+                snaps.append(((d / "meta.json").stat().st_mtime, d))
+        total = sum(_dir_size(d) for _, d in snaps)
+        for _, d in sorted(snaps, key=lambda t: t[0]):
+            if total <= self.max_bytes:
+                break
+            if d.name == keep:
+                continue
+            total -= _dir_size(d)
+            shutil.rmtree(d, ignore_errors=True)
+
+    def clear(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+        self.root.mkdir(parents=True, exist_ok=True)
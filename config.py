@@ -40,3 +40,20 @@ class Company:
 class Settings:
     as_of: date = date.today()
     output_root: Path | None = None
+
+
+@dataclass
+class Mail:
+    """SMTP dispatch settings for mailer.py (password is read from the env var, never stored here)."""
+    host: str = "localhost"
+    port: int = 25
+    username: str | None = None
+    password_env: str = "AR_SMTP_PASSWORD"
+    starttls: bool = False
+    from_addr: str = "netcar@netruckcenter.com"
+    contacts_csv: Path = Path("customer_emails.csv")  # columns: Customer, Email (several: "a@x; b@y")
+    connections: int = 4  # persistent SMTP connections = concurrent sends
+    rate_per_sec: float = 5.0  # per server, across all connections (0 = unlimited)
+    max_retries: int = 3  # transient failures (4xx, disconnects) only
+    backoff_s: float = 1.0  # doubled on every retry
+    timeout_s: float = 30.0
@@ -0,0 +1,162 @@
+"""
+Precomputed dashboard payload: the same numbers as the statements, in the shape Dashboard/dashboard.js
+renders (totals, aging_summary, cust_bucket, risk_top, invoice_detail), so the browser does no parsing
+or aggregation. invoice_detail is columnar with dictionary-encoded text columns.
+"""
+import json
+import shutil
+import tempfile
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config import AGING_BUCKETS, BUCKET_CANON
+from utils import fmt_date_series
+
+PAYLOAD_NAME = "dashboard_payload.json"
+PAYLOAD_VERSION = 1
+TOP_BALANCES = 20  # customers in the "Balances by Aging Bucket" chart
+TOP_RISK = 15  # customers in the "Overdue Risk" chart
+# Buckets that start past 90 days (the "> 90 Days" KPI)
+OVER_90 = [label for (label, _), (_, prev_upper) in zip(AGING_BUCKETS[1:], AGING_BUCKETS)
+           if prev_upper is not None and prev_upper >= 90]
+
+# invoice_detail column -> source column in the normalized detail frame
+_DETAIL_COLUMNS = {
+    "Customer": "customer",
+    "Type": "type",
+    "Invoice Number": "num",
+    "Date": "invoice_date",
+    "Due Date": "due_date",
+    "Open Balance": "amount",
+    "Days Past Due": "days_past_due",
+    "Aging Bucket": "bucket",
+}
+# Low-cardinality text columns sent as {values, codes}
+_DICT_COLUMNS = {"Customer", "Type", "Aging Bucket"}
+_CODE_BLOCK_BYTES = 4 << 20  # codes read back per block when writing
+
+
+class _DictColumn:
+    """Dictionary-encodes one text column batch by batch: codes go to a temp file in first-seen order
+    and are remapped to sorted values when the payload is written."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.f = open(path, "wb")
+        self.codes: dict[str, int] = {}  # value -> first-seen code
+
+    def add(self, values: pd.Series) -> None:
+        local, uniques = pd.factorize(values)
+        first_seen = np.array([self.codes.setdefault(v, len(self.codes)) for v in uniques.tolist()], dtype=np.int32)
+        self.f.write(first_seen[local].tobytes())
+
+    def write_json(self, out) -> None:
+        """{"values": [...sorted], "codes": [...]} onto out."""
+        self.f.close()
+        values = sorted(self.codes)
+        rank = np.empty(len(values), dtype=np.int32)
+        rank[[self.codes[v] for v in values]] = np.arange(len(values), dtype=np.int32)
+        out.write('{"values":' + json.dumps(values, separators=(",", ":")) + ',"codes":[')
+        with open(self.path, "rb") as f:
+            _write_items(out, (rank[np.frombuffer(block, dtype=np.int32)].tolist()
+                               for block in iter(lambda: f.read(_CODE_BLOCK_BYTES), b"")))
+        out.write("]}")
+
+
+class _ListColumn:
+    """One plain column as JSON list items appended batch by batch to a temp file."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.f = open(path, "w", encoding="utf-8")
+
+    def add(self, values: pd.Series) -> None:
+        _write_items(self.f, [values.tolist()], first=self.f.tell() == 0)
+
+    def write_json(self, out) -> None:
+        self.f.close()
+        out.write("[")
+        with open(self.path, encoding="utf-8") as f:
+            shutil.copyfileobj(f, out)
+        out.write("]")
+
+
+def _write_items(out, blocks, first: bool = True) -> None:
+    """Comma-joined JSON list items (no brackets) of each block of Python values."""
+    for block in blocks:
+        if not block:
+            continue
+        out.write(("" if first else ",") + json.dumps(block, separators=(",", ":"))[1:-1])
+        first = False
+
+
+class DashboardPayload:
+    """Streams detail batches into per-column temp files during a build, then writes one payload file.
+    Memory stays bounded by the batch size: only the dictionaries' distinct values are kept."""
+
+    def __init__(self):
+        self._tmp = tempfile.TemporaryDirectory(prefix="ar_payload_")
+        self._columns = {
+            name: (_DictColumn if name in _DICT_COLUMNS else _ListColumn)(Path(self._tmp.name) / f"col{i}")
+            for i, name in enumerate(_DETAIL_COLUMNS)
+        }
+        self._rows = 0
+
+    def add_detail(self, detail: pd.DataFrame) -> None:
+        part = {name: detail[src] for name, src in _DETAIL_COLUMNS.items()}
+        part["Date"] = fmt_date_series(detail["invoice_date"])
+        part["Due Date"] = fmt_date_series(detail["due_date"])
+        part["Open Balance"] = detail["amount"].round(2)
+        for name, values in part.items():
+            self._columns[name].add(values)
+        self._rows += len(detail)
+
+    def to_dict(self, summaries: list[dict], as_of: date) -> dict:
+        """Everything but invoice_detail; summaries: the per-customer rows build_all uses for index.html."""
+        s = pd.DataFrame(summaries).sort_values(["Total Due", "Customer"], ascending=[False, True])
+        bucket_totals = {b: float(s[b].sum()) for b in BUCKET_CANON}
+        total_ar = float(s["Total Due"].sum())
+        current = bucket_totals[BUCKET_CANON[0]]
+
+        top = s.head(TOP_BALANCES)
+        risk = s.assign(_over=s["Overdue Total"].clip(lower=0))
+        risk = risk[risk["Overdue Invoices"] > 0].sort_values(["_over", "Customer"], ascending=[False, True])
+
+        return {
+            "version": PAYLOAD_VERSION,
+            "as_of": as_of.isoformat(),
+            "buckets": BUCKET_CANON,
+            "totals": {
+                "total_ar": round(total_ar, 2),
+                "current_total": round(current, 2),
+                "overdue_total": round(total_ar - current, 2),
+                "over_90": round(sum(bucket_totals[b] for b in OVER_90), 2),
+                "customers_overdue": int(len(risk)),
+                "invoices_overdue": int(s["Overdue Invoices"].sum()),
+            },
+            "aging_summary": [{"bucket": b, "amount": round(bucket_totals[b], 2)} for b in BUCKET_CANON],
+            "cust_bucket": {
+                "customers": top["Customer"].tolist(),
+                "buckets": BUCKET_CANON,
+                "data": {b: top[b].round(2).tolist() for b in BUCKET_CANON},
+            },
+            "risk_top": [
+                {"customer": r["Customer"], "overdue_amount": round(r["_over"], 2),
+                 "max_days_past_due": int(r["Oldest Days Past Due"]), "invoices": int(r["Overdue Invoices"])}
+                for r in risk.head(TOP_RISK).to_dict("records")
+            ],
+        }
+
+    def write(self, path: Path, summaries: list[dict], as_of: date) -> None:
+        """The payload JSON; invoice_detail is streamed from the column files, never held whole."""
+        head = json.dumps(self.to_dict(summaries, as_of), separators=(",", ":"))
+        with open(path, "w", encoding="utf-8") as out:
+            out.write(head[:-1] + f',"invoice_detail":{{"rows":{self._rows},"columns":{{')
+            for i, (name, column) in enumerate(self._columns.items()):
+                out.write(("," if i else "") + json.dumps(name) + ":")
+                column.write_json(out)
+            out.write("}}}")
+        self._tmp.cleanup()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Historical AR store: every build appends its normalized invoice rows and per-customer bucket sums
+to a SQLite database partitioned by as-of date, so trends across runs never need the old exports.
+Run with: python history.py {dates,trend,roll-forward,dso} [...]  (see --help)
+
+A rebuild on the same day replaces that day's partition; earlier dates are never rewritten.
+"""
+import argparse
+import sqlite3
+import time
+from contextlib import closing
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from config import BUCKET_CANON
+from utils import fmt_date_series
+
+HISTORY_NAME = "_ar_history.sqlite"
+DEFAULT_DB = Path("Customer_Statements") / HISTORY_NAME
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    as_of TEXT PRIMARY KEY, recorded_at TEXT NOT NULL, invoices INTEGER NOT NULL,
+    customers INTEGER NOT NULL, total REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS invoices (
+    as_of TEXT NOT NULL, customer TEXT NOT NULL, type TEXT, num TEXT, invoice_date TEXT,
+    due_date TEXT, amount REAL NOT NULL, days_past_due INTEGER, bucket TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS invoices_as_of ON invoices (as_of);
+CREATE INDEX IF NOT EXISTS invoices_customer ON invoices (customer, as_of);
+CREATE INDEX IF NOT EXISTS invoices_invoice_date ON invoices (invoice_date);
+CREATE TABLE IF NOT EXISTS customer_buckets (
+    as_of TEXT NOT NULL, customer TEXT NOT NULL, bucket TEXT NOT NULL,
+    amount REAL NOT NULL, invoices INTEGER NOT NULL,
+    PRIMARY KEY (customer, bucket, as_of)
+);
+CREATE INDEX IF NOT EXISTS customer_buckets_as_of ON customer_buckets (as_of, bucket);
+CREATE TABLE IF NOT EXISTS first_seen (
+    customer TEXT NOT NULL, type TEXT NOT NULL, num TEXT NOT NULL, invoice_date TEXT NOT NULL,
+    as_of TEXT NOT NULL, amount REAL NOT NULL,
+    PRIMARY KEY (customer, type, num, invoice_date)
+);
+-- Covering index: DSO billing sums never touch the table
+CREATE INDEX IF NOT EXISTS first_seen_billing ON first_seen (type, invoice_date, as_of, amount);
+"""
+_INVOICE_COLS = ["customer", "type", "num", "invoice_date", "due_date", "amount", "days_past_due", "bucket"]
+# Identifies the same open item across runs (QuickBooks has no stable row id in the export)
+_INVOICE_KEY = ["customer", "type", "num", "invoice_date"]
+
+
+class HistoryRun:
+    """One as-of partition being written; nothing replaces the old partition until commit()."""
+
+    def __init__(self, store: "HistoryStore", as_of: date):
+        self.store = store
+        self.as_of = as_of.isoformat()
+        self.con = store.connect()
+        self.con.execute("BEGIN")
+        for table in ("invoices", "customer_buckets", "runs", "first_seen"):
+            self.con.execute(f"DELETE FROM {table} WHERE as_of = ?", (self.as_of,))
+        self.invoices = 0
+        self.total = 0.0
+        self.customers: set = set()
+
+    def add(self, detail: pd.DataFrame) -> None:
+        """detail: normalized rows as produced by statements._ingest (one batch)."""
+        rows = detail[_INVOICE_COLS].copy()
+        rows["invoice_date"] = fmt_date_series(rows["invoice_date"]).replace("", None)
+        rows["due_date"] = fmt_date_series(rows["due_date"]).replace("", None)
+        rows.insert(0, "as_of", self.as_of)
+        self.con.executemany(f"INSERT INTO invoices VALUES ({', '.join('?' * len(rows.columns))})",
+                             rows.astype(object).where(rows.notna(), None).itertuples(index=False))
+
+        # Batches never split a customer, so per-customer sums can be written per batch
+        sums = detail.groupby(["customer", "bucket"], sort=False, observed=True)["amount"].agg(["sum", "size"]).reset_index()
+        self.con.executemany("INSERT INTO customer_buckets VALUES (?, ?, ?, ?, ?)",
+                             [(self.as_of, c, b, float(s), int(n)) for c, b, s, n in sums.itertuples(index=False)])
+        self.invoices += len(detail)
+        self.total += float(detail["amount"].sum())
+        self.customers.update(detail["customer"].unique())
+
+    def commit(self) -> None:
+        # Earliest sighting of each open item (billing proxy for DSO); later runs never overwrite it
+        self.con.execute(
+            "INSERT INTO first_seen SELECT customer, COALESCE(type, ''), COALESCE(num, ''), "
+            "COALESCE(invoice_date, ''), as_of, amount FROM invoices WHERE as_of = ? "
+            "ON CONFLICT (customer, type, num, invoice_date) DO UPDATE SET as_of = excluded.as_of, amount = excluded.amount "
+            "WHERE excluded.as_of < first_seen.as_of", (self.as_of,))
+        self.con.execute("INSERT INTO runs VALUES (?, ?, ?, ?, ?)",
+                         (self.as_of, time.strftime("%Y-%m-%dT%H:%M:%S"), self.invoices,
+                          len(self.customers), round(self.total, 2)))
+        self.con.commit()
+        self.con.close()
+
+    def discard(self) -> None:
+        self.con.rollback()
+        self.con.close()
+
+
+class HistoryStore:
+    def __init__(self, path: Path = DEFAULT_DB):
+        self.path = path
+        with closing(self.connect()) as con:
+            con.executescript(_SCHEMA)
+
+    def connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.path, isolation_level=None)
+        con.execute("PRAGMA journal_mode=WAL")
+        return con
+
+    def run(self, as_of: date) -> HistoryRun:
+        return HistoryRun(self, as_of)
+
+    def _query(self, sql: str, params=()) -> pd.DataFrame:
+        with closing(self.connect()) as con:
+            return pd.read_sql_query(sql, con, params=params)
+
+    # ---------- Queries ----------
+    def dates(self) -> pd.DataFrame:
+        """One row per recorded as-of date with invoice/customer counts and total AR."""
+        return self._query("SELECT as_of, invoices, customers, total, recorded_at FROM runs ORDER BY as_of")
+
+    def trend(self, customer: str | None = None, bucket: str | None = None,
+              since: date | None = None, until: date | None = None) -> pd.DataFrame:
+        """Bucket balances per as-of date (rows) for all customers or one; columns in bucket order."""
+        where, params = ["1=1"], []
+        for cond, val in (("customer = ?", customer), ("bucket = ?", bucket),
+                          ("as_of >= ?", since and since.isoformat()), ("as_of <= ?", until and until.isoformat())):
+            if val is not None:
+                where.append(cond)
+                params.append(val)
+        df = self._query(f"SELECT as_of, bucket, SUM(amount) AS amount FROM customer_buckets "
+                         f"WHERE {' AND '.join(where)} GROUP BY as_of, bucket", params)
+        out = df.pivot(index="as_of", columns="bucket", values="amount")
+        out = out.reindex(columns=[b for b in BUCKET_CANON if bucket in (None, b)]).fillna(0.0)
+        out["Total"] = out.sum(axis=1)
+        return out.round(2)
+
+    def roll_forward(self, start: date, end: date, customer: str | None = None) -> pd.DataFrame:
+        """Per-customer walk from the start balance to the end balance:
+        opening + new - cleared + adjusted = closing
+        (new = items only at end, cleared = items only at start, adjusted = balance changes on items in both).
+        """
+        a, b = start.isoformat(), end.isoformat()
+        only = "AND customer = ?" if customer is not None else ""
+        items = (f"SELECT customer, SUM(CASE WHEN as_of = ? THEN amount END) AS o, "
+                 f"SUM(CASE WHEN as_of = ? THEN amount END) AS c FROM invoices "
+                 f"WHERE as_of IN (?, ?) {only} GROUP BY {', '.join(_INVOICE_KEY)}")
+        out = self._query(
+            f"SELECT customer, TOTAL(o) AS opening, TOTAL(CASE WHEN o IS NULL THEN c END) AS new, "
+            f"TOTAL(CASE WHEN c IS NULL THEN o END) AS cleared, "
+            f"TOTAL(CASE WHEN o IS NOT NULL AND c IS NOT NULL THEN c - o END) AS adjusted, "
+            f"TOTAL(c) AS closing FROM ({items}) GROUP BY customer ORDER BY customer",
+            [a, b, a, b] + ([customer] if customer is not None else [])).set_index("customer")
+        out.loc["Total"] = out.sum()
+        return out.round(2)
+
+    def dso(self, window_days: int = 90, since: date | None = None, until: date | None = None) -> pd.DataFrame:
+        """Count-through DSO per as-of date: AR / billed in the trailing window * window_days.
+        Billed = first-seen open balance of invoices dated inside the window (the export only carries
+        open items, so fully paid-before-seen invoices are missing; more frequent runs mean better coverage).
+        """
+        runs = self.dates()
+        if since:
+            runs = runs[runs["as_of"] >= since.isoformat()]
+        if until:
+            runs = runs[runs["as_of"] <= until.isoformat()]
+        rows = []
+        with closing(self.connect()) as con:
+            for as_of, ar in zip(runs["as_of"], runs["total"]):
+                lo = (date.fromisoformat(as_of) - timedelta(days=window_days)).isoformat()
+                billed = con.execute(
+                    "SELECT TOTAL(amount) FROM first_seen "
+                    "WHERE type = 'Invoice' AND invoice_date > ? AND invoice_date <= ? AND as_of <= ?",
+                    (lo, as_of, as_of)).fetchone()[0]
+                rows.append({"as_of": as_of, "ar": ar, "billed": round(billed, 2),
+                             "dso": round(ar / billed * window_days, 1) if billed > 0 else None})
+        return pd.DataFrame(rows, columns=["as_of", "ar", "billed", "dso"]).set_index("as_of")
+
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description="Query the historical AR store written by statements.py.")
+    ap.add_argument("--db", type=Path, default=DEFAULT_DB, help=f"history database (default {DEFAULT_DB})")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("dates", help="list recorded as-of dates")
+    t = sub.add_parser("trend", help="bucket balances across as-of dates")
+    t.add_argument("--customer")
+    t.add_argument("--bucket", choices=BUCKET_CANON)
+    rf = sub.add_parser("roll-forward", help="opening/new/cleared/adjusted/closing between two as-of dates")
+    rf.add_argument("start", type=date.fromisoformat)
+    rf.add_argument("end", type=date.fromisoformat)
+    rf.add_argument("--customer")
+    d = sub.add_parser("dso", help="days sales outstanding per as-of date")
+    d.add_argument("--window", type=int, default=90, help="trailing billing window in days (default 90)")
+    for p in (t, d):
+        p.add_argument("--since", type=date.fromisoformat)
+        p.add_argument("--until", type=date.fromisoformat)
+    args = ap.parse_args(argv)
+
+    if not args.db.exists():
+        raise SystemExit(f"No history at {args.db}. Run statements.py first.")
+    store = HistoryStore(args.db)
+    t0 = time.perf_counter()
+    if args.cmd == "dates":
+        out = store.dates()
+    elif args.cmd == "trend":
+        out = store.trend(args.customer, args.bucket, args.since, args.until)
+    elif args.cmd == "roll-forward":
+        out = store.roll_forward(args.start, args.end, args.customer)
+    else:
+        out = store.dso(args.window, args.since, args.until)
+    print(out.to_string() if len(out) else "(no rows)")
+    print(f"   {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
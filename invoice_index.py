@@ -0,0 +1,141 @@
+"""
+Open-items index: the latest build's normalized invoice rows in an indexed SQLite file, so single
+statements (or a filtered subset) can be re-rendered without re-reading the export.
+Written during build_all; used by `python statements.py render ...`.
+
+The file always holds exactly one as-of snapshot: a build writes a temp file and swaps it in.
+Its meta row also keeps the build's branding and output root, so a re-render matches what the build wrote.
+"""
+import json
+import os
+import sqlite3
+from contextlib import closing
+from dataclasses import asdict
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+from config import Company
+from utils import fmt_date_series
+
+INDEX_DB_NAME = "_open_items.sqlite"
+
+# Columns of statements._DETAIL_COLS plus the row's position in the export (tie-breaks depend on it)
+_COLUMNS = {
+    "row_id": "INTEGER PRIMARY KEY", "customer": "TEXT NOT NULL", "type": "TEXT", "num": "TEXT",
+    "po": "TEXT", "terms": "TEXT", "invoice_date": "TEXT", "due_date": "TEXT",
+    "amount": "REAL NOT NULL", "days_past_due": "INTEGER NOT NULL", "bucket": "TEXT NOT NULL",
+}
+_SCHEMA = f"""
+CREATE TABLE meta (as_of TEXT NOT NULL, company TEXT, output_root TEXT);
+CREATE TABLE open_items ({", ".join(f"{c} {t}" for c, t in _COLUMNS.items())});
+"""
+# Built after the bulk insert (cheaper than maintaining them row by row)
+_INDEXES = """
+CREATE INDEX open_items_customer ON open_items (customer);
+CREATE INDEX open_items_bucket ON open_items (bucket, customer, amount);
+CREATE INDEX open_items_due_date ON open_items (due_date);
+CREATE INDEX open_items_num ON open_items (num);
+"""
+_DATE_COLS = ["invoice_date", "due_date"]
+
+
+class InvoiceIndexWriter:
+    """Collects detail batches into <path>.tmp; commit() replaces the live index."""
+
+    def __init__(self, path: Path, as_of: date, company: Company | None = None):
+        self.path = path
+        self.tmp = path.with_name(path.name + ".tmp")
+        self.tmp.unlink(missing_ok=True)
+        self.con = sqlite3.connect(self.tmp)
+        self.con.executescript("PRAGMA journal_mode=OFF; PRAGMA synchronous=OFF;" + _SCHEMA)
+        self.con.execute("INSERT INTO meta VALUES (?, ?, ?)",
+                         (as_of.isoformat(), json.dumps(asdict(company or Company())), str(path.parent)))
+
+    def add(self, detail: pd.DataFrame) -> None:
+        rows = detail.copy()
+        for c in _DATE_COLS:
+            rows[c] = fmt_date_series(rows[c]).replace("", None)
+        rows = rows.reset_index(names="row_id")[list(_COLUMNS)]
+        self.con.executemany(f"INSERT INTO open_items VALUES ({', '.join('?' * len(_COLUMNS))})",
+                             rows.astype(object).where(rows.notna(), None).itertuples(index=False))
+
+    def commit(self) -> None:
+        self.con.executescript(_INDEXES + "ANALYZE;")
+        self.con.commit()
+        self.con.close()
+        os.replace(self.tmp, self.path)
+
+    def discard(self) -> None:
+        self.con.close()
+        self.tmp.unlink(missing_ok=True)
+
+
+class InvoiceIndex:
+    def __init__(self, path: Path):
+        if not path.exists():
+            raise FileNotFoundError(path)
+        self.path = path
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+
+    def _meta(self) -> dict:
+        with closing(self._connect()) as con:
+            cur = con.execute("SELECT * FROM meta")  # indexes from older builds only have as_of
+            return dict(zip([d[0] for d in cur.description], cur.fetchone()))
+
+    def as_of(self) -> date:
+        return date.fromisoformat(self._meta()["as_of"])
+
+    def company(self) -> Company:
+        """Branding the build used (config.Company defaults for indexes written before it was stored)."""
+        stored = self._meta().get("company")
+        return Company(**json.loads(stored)) if stored else Company()
+
+    def output_root(self) -> Path | None:
+        """Folder the build wrote into (None for indexes written before it was stored)."""
+        stored = self._meta().get("output_root")
+        return Path(stored) if stored else None
+
+    def customers(self, names: list[str] | None = None, bucket: str | None = None,
+                  min_balance: float | None = None) -> list[str]:
+        """Customers matching every given filter, in name order.
+        min_balance applies to the bucket's balance when a bucket is given, else to the total due.
+        """
+        where, params = ["1=1"], []
+        if names:
+            where.append(f"customer IN ({', '.join('?' * len(names))})")
+            params += names
+        if bucket:
+            where.append("bucket = ?")
+            params.append(bucket)
+        having = ""
+        if min_balance is not None:
+            having = "HAVING SUM(amount) > ?"
+            params.append(min_balance)
+        with closing(self._connect()) as con:
+            return [r[0] for r in con.execute(
+                f"SELECT customer FROM open_items WHERE {' AND '.join(where)} "
+                f"GROUP BY customer {having} ORDER BY customer", params)]
+
+    def totals(self) -> dict[str, float]:
+        """Customer -> total due (summed in export order, as the build does)."""
+        with closing(self._connect()) as con:
+            df = pd.read_sql_query("SELECT customer, amount FROM open_items ORDER BY row_id", con)
+        return df.groupby("customer", sort=True)["amount"].sum().to_dict()
+
+    def rows(self, customers: list[str]) -> pd.DataFrame:
+        """Detail rows for these customers, shaped like statements._ingest output."""
+        with closing(self._connect()) as con:
+            con.execute("CREATE TEMP TABLE wanted (customer TEXT PRIMARY KEY)")
+            con.executemany("INSERT OR IGNORE INTO wanted VALUES (?)", [(c,) for c in customers])
+            df = pd.read_sql_query("SELECT o.* FROM open_items o JOIN wanted USING (customer) ORDER BY o.row_id",
+                                   con, index_col="row_id")
+        df.index.name = None
+        for c in _DATE_COLS:
+            df[c] = pd.to_datetime(df[c], format="%Y-%m-%d")
+        for c in ("type", "num", "po", "terms"):
+            df[c] = df[c].fillna("")
+        return df.astype({"amount": float, "days_past_due": "int64"})
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Email dispatch: one message per customer (EMAIL_TXT rendered as plain text, like email_template.txt
+but without HTML escaping) with the statement attached, sent over a pool of persistent SMTP connections.
+Run with: python mailer.py send [--contacts customer_emails.csv] [--host H --port P] [--connections N] [--rate R]
+     or: python mailer.py stand-in [--port 2525]   (local SMTP stand-in for trial runs)
+
+Works from the last build (its open-items index gives the as-of date and customers).
+Every outcome is appended to _send_log.jsonl; rerunning skips messages already sent.
+Throughput and phase timings go to _send_report.json.
+"""
+import argparse
+import csv
+import json
+import os
+import queue
+import random
+import smtplib
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from email.message import EmailMessage
+from pathlib import Path
+
+from config import Company, Mail
+from invoice_index import INDEX_DB_NAME, InvoiceIndex
+from report import RunReport
+from statements import email_message, statement_path
+from utils import fmt_money
+
+SEND_LOG_NAME = "_send_log.jsonl"
+SEND_REPORT_NAME = "_send_report.json"
+
+
+# ---------- Outbox ----------
+@dataclass
+class OutboxItem:
+    customer: str
+    to: list[str]
+    subject: str
+    body: str  # plain text (EMAIL_TXT rendered unescaped, not the HTML-escaped email_template.txt)
+    statement: Path
+    key: str  # identifies this send in the log: as-of date + customer
+
+    def message(self, from_addr: str) -> EmailMessage:
+        msg = EmailMessage()
+        msg["Subject"] = self.subject
+        msg["From"] = from_addr
+        msg["To"] = ", ".join(self.to)
+        msg.set_content(self.body)
+        msg.add_attachment(self.statement.read_bytes(), maintype="text", subtype="html",
+                           filename=self.statement.name)
+        return msg
+
+
+def load_contacts(path: Path) -> dict[str, list[str]]:
+    """Customer -> addresses from a CSV with Customer and Email columns."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return {
+            r["Customer"].strip(): [a.strip() for a in r["Email"].replace(",", ";").split(";") if a.strip()]
+            for r in csv.DictReader(f) if (r.get("Customer") or "").strip() and (r.get("Email") or "").strip()
+        }
+
+
+def build_outbox(base_root: Path, contacts: dict[str, list[str]],
+                 company: Company | None = None) -> tuple[list[OutboxItem], list[str]]:
+    """(messages to send, customers skipped for lack of an address or statement).
+    company defaults to the branding the build used (stored in its open-items index)."""
+    index = InvoiceIndex(base_root / INDEX_DB_NAME)
+    as_of = index.as_of()
+    company = company or index.company()
+    items, skipped = [], []
+    for customer, total_due in index.totals().items():
+        path = statement_path(base_root, customer, as_of)
+        if customer not in contacts or not path.exists():
+            skipped.append(customer)
+            continue
+        subject, body = email_message(company, as_of, customer, fmt_money(total_due))
+        items.append(OutboxItem(customer, contacts[customer], subject, body, path, f"{as_of.isoformat()}|{customer}"))
+    return items, skipped
+
+
+# ---------- Sending ----------
+class RateLimiter:
+    """Evenly spaced sends across threads: at most rate_per_sec starts per second (0 = unlimited)."""
+
+    def __init__(self, rate_per_sec: float):
+        self.interval = 1.0 / rate_per_sec if rate_per_sec > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(self._next, now)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class SmtpPool:
+    """Up to `size` persistent connections, opened lazily and reused across messages.
+    A connection that failed at the socket/protocol level is closed instead of being returned.
+    """
+
+    def __init__(self, mail: Mail, size: int):
+        self.mail = mail
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.opened = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(self.mail.host, self.mail.port, timeout=self.mail.timeout_s)
+        if self.mail.starttls:
+            conn.starttls()
+        if self.mail.username:
+            conn.login(self.mail.username, os.environ.get(self.mail.password_env, ""))
+        self.opened += 1
+        return conn
+
+    @contextmanager
+    def connection(self):
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                if conn.sock is not None:  # server replied with an error; the session is still usable unless
+                    self._idle.put(conn)   # smtplib already closed it (421)
+                raise
+            except BaseException:
+                _close(conn)
+                raise
+            self._idle.put(conn)
+
+    def close(self) -> None:
+        while not self._idle.empty():
+            conn = self._idle.get_nowait()
+            try:
+                conn.quit()
+            except (smtplib.SMTPException, OSError):
+                _close(conn)
+
+
+def _close(conn: smtplib.SMTP) -> None:
+    try:
+        conn.close()
+    except OSError:
+        pass
+
+
+def _permanent(err: Exception) -> bool:
+    """5xx replies (for refused recipients: every recipient's) won't succeed on retry; everything else might."""
+    if isinstance(err, smtplib.SMTPRecipientsRefused):
+        return all(500 <= code < 600 for code, _ in err.recipients.values())
+    return isinstance(err, smtplib.SMTPResponseException) and 500 <= err.smtp_code < 600
+
+
+class SendLog:
+    """Append-only JSON-lines log of final outcomes; keys logged as "sent" are skipped on resume."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def sent_keys(self) -> set[str]:
+        if not self.path.exists():
+            return set()
+        with open(self.path, encoding="utf-8") as f:
+            return {e["key"] for e in map(json.loads, f) if e.get("status") == "sent"}
+
+    def record(self, item: OutboxItem, status: str, attempts: int, error: str | None = None) -> None:
+        entry = {"key": item.key, "customer": item.customer, "to": item.to, "status": status,
+                 "attempts": attempts, "error": error, "at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+
+def send_outbox(items: list[OutboxItem], mail: Mail, log: SendLog) -> dict:
+    """Send items over mail.connections persistent connections; returns counts by outcome."""
+    pool = SmtpPool(mail, mail.connections)
+    limiter = RateLimiter(mail.rate_per_sec)
+    counts = {"sent": 0, "failed": 0, "retries": 0, "bytes": 0}
+    lock = threading.Lock()
+
+    def send(item: OutboxItem) -> None:
+        msg = item.message(mail.from_addr)
+        size = len(msg.as_bytes())
+        attempt, error = 0, None
+        while attempt <= mail.max_retries:
+            attempt += 1
+            limiter.wait()
+            try:
+                with pool.connection() as conn:
+                    conn.send_message(msg)
+                error = None
+                break
+            except (smtplib.SMTPException, OSError) as err:
+                error = f"{type(err).__name__}: {err}"
+                if _permanent(err) or attempt > mail.max_retries:
+                    break
+                time.sleep(mail.backoff_s * 2 ** (attempt - 1) * random.uniform(0.8, 1.2))
+        status = "failed" if error else "sent"
+        log.record(item, status, attempt, error)
+        with lock:
+            counts[status] += 1
+            counts["retries"] += attempt - 1
+            if not error:
+                counts["bytes"] += size
+
+    try:
+        with ThreadPoolExecutor(max_workers=mail.connections, thread_name_prefix="smtp") as ex:
+            list(ex.map(send, items))
+    finally:
+        pool.close()
+    counts["connections_opened"] = pool.opened
+    return counts
+
+
+def dispatch(base_root: Path, mail: Mail, resume: bool = True, limit: int | None = None) -> RunReport:
+    report = RunReport()
+    log = SendLog(base_root / SEND_LOG_NAME)
+    with report.phase("outbox") as p:
+        items, skipped = build_outbox(base_root, load_contacts(mail.contacts_csv))
+        done = log.sent_keys() if resume else set()
+        pending = [i for i in items if i.key not in done]
+        todo = pending[:limit]
+        p["rows"] += len(items)
+    with report.phase("send") as p:
+        counts = send_outbox(todo, mail, log)
+        p["rows"] += len(todo)
+    seconds = report.phases["send"]["seconds"]
+    report.counts.update(counts, no_contact_or_statement=len(skipped), already_sent=len(items) - len(pending))
+    report.counts["msgs_per_sec"] = round(counts["sent"] / seconds, 1) if seconds else 0
+    report.write(base_root / SEND_REPORT_NAME)
+
+    print(f"📧 Sent {counts['sent']}/{len(todo)} in {seconds:.1f}s ({report.counts['msgs_per_sec']} msg/s) "
+          f"over {counts['connections_opened']} connections; {counts['failed']} failed, {counts['retries']} retries")
+    if skipped:
+        print(f"   Skipped {len(skipped)} customers without an address or statement")
+    print(f"   Log: {log.path}")
+    return report
+
+
+# ---------- Local stand-in SMTP server ----------
+class _StandInHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT."""
+
+    def _reply(self, line: str) -> None:
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self) -> None:
+        srv = self.server
+        self._reply("220 stand-in ESMTP")
+        while line := self.rfile.readline():
+            verb = line[:4].decode("ascii", "replace").upper()
+            if verb == "EHLO":
+                self._reply("250-stand-in")
+                self._reply("250 8BITMIME")
+            elif verb in ("HELO", "MAIL", "RCPT", "RSET", "NOOP"):
+                self._reply("250 OK")
+            elif verb == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while (chunk := self.rfile.readline()) not in (b".\r\n", b""):
+                    lines.append(chunk)
+                if not chunk:  # client dropped mid-message
+                    return
+                data = b"".join(lines)
+                time.sleep(srv.latency)
+                if random.random() < srv.fail_rate:
+                    self._reply("451 Try again later")
+                    continue
+                with srv.lock:
+                    srv.received += 1
+                    n = srv.received
+                if srv.save_dir:
+                    (srv.save_dir / f"{n:06d}.eml").write_bytes(data)
+                self._reply("250 Queued")
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Not implemented")
+
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    """Local SMTP sink for trial runs/benchmarks: optional per-message latency and 451 failure rate."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port: int = 2525, latency: float = 0.0, fail_rate: float = 0.0,
+                 save_dir: Path | None = None):
+        super().__init__(("127.0.0.1", port), _StandInHandler)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.save_dir = save_dir
+        self.received = 0
+        self.lock = threading.Lock()
+
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description="Email statements from the last build.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("send", help="send every customer's statement (resumes from the send log)")
+    defaults = Mail()
+    s.add_argument("--contacts", type=Path, default=defaults.contacts_csv, help="CSV with Customer, Email columns")
+    s.add_argument("--host", default=defaults.host)
+    s.add_argument("--port", type=int, default=defaults.port)
+    s.add_argument("--connections", type=int, default=defaults.connections, help="persistent SMTP connections")
+    s.add_argument("--rate", type=float, default=defaults.rate_per_sec, help="messages/sec cap (0 = unlimited)")
+    s.add_argument("--retries", type=int, default=defaults.max_retries)
+    s.add_argument("--limit", type=int, default=None, help="send at most N messages this run")
+    s.add_argument("--no-resume", action="store_true", help="resend even if the log says sent")
+    s.add_argument("--output-root", type=Path, default=Path("Customer_Statements"),
+                   help="output root of the build to send (e.g. a batch entity's \"output\" folder)")
+    si = sub.add_parser("stand-in", help="run a local SMTP stand-in server (Ctrl+C to stop)")
+    si.add_argument("--port", type=int, default=2525)
+    si.add_argument("--latency", type=float, default=0.0, help="seconds per message")
+    si.add_argument("--fail-rate", type=float, default=0.0, help="share of messages answered 451")
+    si.add_argument("--save", type=Path, default=None, help="write received messages as .eml here")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "stand-in":
+        if args.save:
+            args.save.mkdir(parents=True, exist_ok=True)
+        with StandInSMTPServer(args.port, args.latency, args.fail_rate, args.save) as srv:
+            print(f"Stand-in SMTP listening on 127.0.0.1:{args.port}")
+            try:
+                srv.serve_forever()
+            except KeyboardInterrupt:
+                print(f"Received {srv.received} messages")
+        return
+
+    mail = replace(defaults, contacts_csv=args.contacts, host=args.host, port=args.port,
+                   connections=args.connections, rate_per_sec=args.rate, max_retries=args.retries)
+    base_root = args.output_root.resolve()
+    if not (base_root / INDEX_DB_NAME).exists():
+        raise SystemExit(f"No build found in {base_root}. Run statements.py first.")
+    if not mail.contacts_csv.exists():
+        raise SystemExit(f"No contacts file at {mail.contacts_csv} (columns: Customer, Email).")
+    dispatch(base_root, mail, resume=not args.no_resume, limit=args.limit)
+
+
+if __name__ == "__main__":
+    main()
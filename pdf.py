@@ -0,0 +1,99 @@
+"""
+PDF statements: each statement HTML is rendered to a PDF next to it with WeasyPrint (local, no browser),
+in a process pool whose workers parse the shared print stylesheet once each.
+Used by `python statements.py --pdf`. Requires: pip install weasyprint (plus its Pango system libraries).
+
+Rendering is fully offline: the company logo is downloaded once into .cache/assets/ and served from
+there, and the Bootstrap CDN stylesheet is replaced by templates.PDF_CSS.
+"""
+import hashlib
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from templates import PDF_CSS
+
+try:
+    import weasyprint
+    from weasyprint.text.fonts import FontConfiguration
+except (ImportError, OSError):  # not installed, or its Pango system libraries are missing
+    weasyprint = None
+PDF_AVAILABLE = weasyprint is not None
+
+ASSET_DIR = Path(".cache") / "assets"  # relative to the output root
+
+# Per-process state set by _init_pdf (shared stylesheet parsed once per worker)
+_pdf_ctx: dict = {}
+
+
+def cache_asset(url: str | None, asset_dir: Path, timeout: float = 10.0) -> Path | None:
+    """Local copy of a remote asset (downloaded on first use); None if it can't be fetched."""
+    if not url or not url.startswith(("http://", "https://")):
+        return None
+    path = asset_dir / hashlib.blake2b(url.encode("utf-8"), digest_size=16).hexdigest()
+    if path.exists():
+        return path
+    asset_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as resp:
+            data = resp.read()
+    except OSError as err:
+        print(f"⚠️  Could not fetch {url} ({err}); PDFs will have no logo")
+        return None
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(data)
+    tmp.replace(path)
+    return path
+
+
+def _init_pdf(assets: dict[str, Path]) -> None:
+    _pdf_ctx.update(
+        css=weasyprint.CSS(string=PDF_CSS),
+        fonts=FontConfiguration(),
+        assets={url: p.read_bytes() for url, p in assets.items()},
+    )
+
+
+def _fetch(url: str, *args, **kwargs) -> dict:
+    """Offline URL fetcher: cached assets by URL, nothing else from the network."""
+    if url in _pdf_ctx["assets"]:
+        return {"string": _pdf_ctx["assets"][url]}
+    if url.startswith(("http://", "https://")):
+        if url.endswith(".css"):
+            return {"string": b"", "mime_type": "text/css"}  # CDN stylesheet: PDF_CSS stands in
+        raise ValueError(f"offline: {url}")  # WeasyPrint logs it and skips the resource
+    return weasyprint.default_url_fetcher(url, *args, **kwargs)
+
+
+def _render_pdf(html_path: Path) -> tuple[int, float]:
+    """Render one statement -> (pages, seconds)."""
+    t0 = time.perf_counter()
+    doc = weasyprint.HTML(filename=str(html_path), url_fetcher=_fetch).render(
+        stylesheets=[_pdf_ctx["css"]], font_config=_pdf_ctx["fonts"])
+    doc.write_pdf(html_path.with_suffix(".pdf"))
+    return len(doc.pages), time.perf_counter() - t0
+
+
+def render_pdfs(html_paths: list[Path], logo_src: str | None, asset_dir: Path,
+                workers: int = 1, force: bool = False) -> tuple[int, int]:
+    """PDF next to each statement HTML -> (statements rendered, pages).
+    Statements whose PDF is newer than the HTML are skipped unless force=True.
+    """
+    if not PDF_AVAILABLE:
+        raise SystemExit("PDF output needs WeasyPrint: pip install weasyprint (plus its Pango libraries).")
+    todo = [p for p in map(Path, html_paths)
+            if force or not p.with_suffix(".pdf").exists()
+            or p.with_suffix(".pdf").stat().st_mtime < p.stat().st_mtime]
+    if not todo:
+        return 0, 0
+    logo = cache_asset(logo_src, asset_dir)
+    assets = {logo_src: logo} if logo else {}
+
+    if workers <= 1:
+        _init_pdf(assets)
+        results = list(map(_render_pdf, todo))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_pdf, initargs=(assets,)) as pool:
+            results = list(pool.map(_render_pdf, todo, chunksize=max(1, len(todo) // (workers * 8))))
+    return len(todo), sum(pages for pages, _ in results)
@@ -0,0 +1,125 @@
+"""
+Run instrumentation: per-phase wall time / rows / peak memory and per-customer render+write timings,
+written as a machine-readable JSON run report next to index.html.
+"""
+import json
+import sys
+import time
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, peak memory is reported as None
+    resource = None
+
+
+_STATUS = Path("/proc/self/status")
+_CLEAR_REFS = Path("/proc/self/clear_refs")
+
+
+def peak_rss_mb() -> float | None:
+    """High-water RSS of this process and its (finished) children, in MB."""
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)  # bytes on macOS, KB elsewhere
+
+
+def _hwm_mb() -> float | None:
+    """This process's RSS high-water mark since the last _reset_hwm (Linux VmHWM), in MB; None elsewhere."""
+    try:
+        with open(_STATUS, encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)  # kB
+    except OSError:
+        pass
+    return None
+
+
+def _reset_hwm() -> bool:
+    """Restart the high-water mark at the current RSS (Linux: "5" > /proc/self/clear_refs)."""
+    try:
+        _CLEAR_REFS.write_text("5")
+        return True
+    except OSError:
+        return False
+
+
+class RunReport:
+    def __init__(self):
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self.phases: dict[str, dict] = {}
+        self.customers: list[tuple[str, float, float]] = []
+        self.counts: dict[str, int] = {}
+        self.memory: dict[str, float] = {}  # e.g. MB per million rows of the detail frame
+        self._open: list[dict] = []  # phases in progress, outermost first
+        self._peak_mb: float | None = None  # process high-water across resets (see phase)
+        self.totals: dict[str, float] = {}  # AR of the run: per bucket, total due, overdue
+        self.as_of: date | None = None  # statement date of a build (set by build_all)
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a phase; re-entering the same name (streaming chunks, batches) accumulates.
+        Yields the phase dict so callers can add to its "rows".
+        peak_rss_mb is the most this process held during the phase (max over calls): on Linux the
+        high-water mark is reset at entry and read at exit. Elsewhere it is the process-lifetime peak.
+        """
+        p = self.phases.setdefault(name, {"seconds": 0.0, "rows": 0, "calls": 0})
+        self._held(_hwm_mb(), self._open)  # fold the peak so far into open phases before the reset discards it
+        per_phase = _reset_hwm()
+        self._open.append(p)
+        t0 = time.perf_counter()
+        try:
+            yield p
+        finally:
+            p["seconds"] += time.perf_counter() - t0
+            p["calls"] += 1
+            self._open.pop()
+            self._held(_hwm_mb() if per_phase else peak_rss_mb(), [p, *self._open])  # enclosing phases too
+            p.setdefault("peak_rss_mb", None)
+
+    def _held(self, mb: float | None, phases: list[dict]) -> None:
+        """Record that mb was resident: raises the run peak and each phase's peak_rss_mb."""
+        if mb is None:
+            return
+        self._peak_mb = max(self._peak_mb or 0.0, mb)
+        for q in phases:
+            q["peak_rss_mb"] = max(q.get("peak_rss_mb") or 0.0, mb)
+
+    def peak_rss_mb(self) -> float | None:
+        """Peak RSS of the whole run (phase resets clear the kernel's own lifetime figure)."""
+        self._held(_hwm_mb(), [])
+        lifetime = peak_rss_mb()
+        if self._peak_mb is None:
+            return lifetime
+        return max(self._peak_mb, lifetime or 0.0)
+
+    def add_customer(self, customer: str, render_s: float, write_s: float) -> None:
+        self.customers.append((customer, render_s, write_s))
+
+    def to_dict(self, slowest: int = 20) -> dict:
+        by_total = sorted(self.customers, key=lambda c: c[1] + c[2], reverse=True)
+        return {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "as_of": self.as_of.isoformat() if self.as_of else None,
+            "wall_seconds": round(time.perf_counter() - self._t0, 4),
+            "peak_rss_mb": self.peak_rss_mb(),
+            "counts": self.counts,
+            "memory": self.memory,
+            "totals": self.totals,
+            "phases": {k: {**v, "seconds": round(v["seconds"], 4)} for k, v in self.phases.items()},
+            "customers_rendered": len(self.customers),
+            "render_seconds_total": round(sum(c[1] for c in self.customers), 4),
+            "write_seconds_total": round(sum(c[2] for c in self.customers), 4),
+            "slowest_customers": [
+                {"customer": c, "render_s": round(r, 5), "write_s": round(w, 5)} for c, r, w in by_total[:slowest]
+            ],
+        }
+
+    def write(self, path: Path) -> None:
+        path.write_text(json.dumps(self.to_dict(), indent=2), encoding="utf-8")
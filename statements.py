@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 """
 NETC AR Statement Builder — single-file entry point (formerly pipeline.py).
-Run with: python statements.py
+Run with: python statements.py [--workers N] [--force] [--chunksize N] [--pdf] [--bundle zip|tar]
+      or: python statements.py render [--customer NAME] [--bucket 120+ --min-balance 5000]
+      or: python statements.py [build options] watch [--interval 1] [--settle 2]  (rebuild on new exports)
+      or: python statements.py [build options] batch entities.json [--processes N]  (many entities, one run)
 
 - Root folder is constant: Customer_Statements
 - One subfolder per customer (slug)
@@ -9,90 +12,441 @@ Run with: python statements.py
     <Customer>/<slug>_YYYYMMDD.html
   Overwrite same-day; keep different days.
 - email_template.txt is always the latest only (overwrite)
-- Top-level index.html overwritten each run
+- _rejected_rows.csv + _rejected_summary.json: dropped export rows with the first failing filter,
+  and per-reason counts with sample rows
+- Top-level index.html + index_data.js (paged, searchable customer list) overwritten each run
+- dashboard_payload.json: precomputed data for Dashboard/dashboard.html (overwritten each run)
+- _open_items.sqlite: the latest build's open items, indexed for `render` (replaced each run)
+- _ar_history.sqlite: every run's rows + per-customer bucket sums by as-of date (query with history.py)
+- .cache/ingest/ holds normalized snapshots keyed by export fingerprint + as-of date
+- .cache/jinja/ holds compiled template bytecode (invalidated when templates.py changes)
+- --bundle zip|tar writes the statements, templates and top-level files into one
+  statements_YYYYMMDD.zip / .tar.gz (atomic rename; see bundle.py) instead of the folder tree
+- watch keeps the process (imports, compiled templates) warm and rebuilds when an export lands;
+  each rebuild's latency is appended to _watch_log.jsonl (see watch.py)
+- batch builds several entities (branding, export, output root) in one process pool and writes a
+  consolidated index to Customer_Statements_All/ (see batch.py)
+- _build_manifest.json records a content hash per customer; reruns only
+  re-render customers whose rows/metrics changed (--force rebuilds all)
 """
+import argparse
+import hashlib
+import json
 import os
+import tempfile
 import textwrap
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict
 from datetime import date
+from functools import lru_cache
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
-from jinja2 import Environment, BaseLoader, select_autoescape
+from jinja2 import DictLoader, Environment, FileSystemBytecodeCache, select_autoescape
 from slugify import slugify
 
+from bundle import BUNDLE_FORMATS, BundleWriter
+from cache import IngestCache, fingerprint
 from config import Company, BUCKET_CANON
-from templates import INDEX_HTML, STATEMENT_HTML, EMAIL_TXT
+from dashboard_payload import DashboardPayload, PAYLOAD_NAME
+from history import HistoryStore, HISTORY_NAME
+from invoice_index import InvoiceIndex, InvoiceIndexWriter, INDEX_DB_NAME
+from pdf import ASSET_DIR, PDF_AVAILABLE, render_pdfs
+from report import RunReport
+from templates import INDEX_HTML, STATEMENT_HTML, EMAIL_TXT, BATCH_INDEX_HTML
 from utils import (
-    ALIASES, pick, clean_str, parse_money, fmt_money,
-    autodetect_csv, bucketize, clean_folder_name
+    ALIASES, pick, clean_str_series, parse_money_series, parse_date_series, fmt_money, fmt_money_series,
+    fmt_date_series, autodetect_csv, bucketize_series, clean_folder_name
 )
 
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+except ImportError:  # pandas reader only
+    pa = None
+
 
 # ---------- Helpers moved out of the giant script ----------
-def _normalize_bucket(raw_aging, dpd):
-    """Return canonical bucket label, preferring computed DPD over any raw label.
-    Logic:
-      1) If dpd is a valid number, return bucketize(dpd).
+def _normalize_buckets(raw_aging: pd.Series, dpd: pd.Series) -> pd.Series:
+    """Canonical bucket labels, preferring computed DPD over any raw label.
+    Logic (per row, evaluated column-wise):
+      1) If dpd is a valid number, bucketize(dpd).
       2) Else, if raw_aging is numeric-like, bucketize that number.
-      3) Else, return 'Current'.
+      3) Else, 'Current'.
+    """
+    raw_days = pd.to_numeric(clean_str_series(raw_aging), errors="coerce")
+    raw_days = raw_days.where(np.isfinite(raw_days))  # int(float("inf")) never bucketed
+    days = pd.to_numeric(dpd, errors="coerce")
+    return bucketize_series(days.where(days.notna(), raw_days))
+
+
+# Statement row order: overdue first, then oldest due first (customer leads so one sort partitions)
+_ROW_ORDER = ["customer", "is_overdue", "due_date", "invoice_date", "num"]
+_ROW_ASCENDING = [True, False, True, True, True]
+
+
+def _partition(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Group the filtered frame once instead of rescanning it per customer.
+    Returns (sdf, agg): sdf is sorted by customer then statement row order (original
+    index kept), so each customer is the contiguous slice sdf.iloc[start:stop];
+    agg is indexed by customer (sorted) and holds the offsets plus every aggregate.
     """
-    # Step 1: Trust computed days-past-due when available
+    sdf = df.sort_values(_ROW_ORDER, ascending=_ROW_ASCENDING, kind="stable")
+    cust = sdf["customer"]
+    amount = sdf["amount"]
+    overdue = sdf["is_overdue"]
+    over_open = overdue & (amount > 0)  # avg/oldest DPD consider open overdue lines only
+
+    g = sdf.groupby(cust, sort=True, observed=True)
+    sizes = g.size()
+    agg = pd.DataFrame({
+        "invoices": sizes,
+        "overdue_invoices": g["is_overdue"].sum().astype("int64"),
+        "total_due": g["amount"].sum(),
+        "overdue_total": amount.where(overdue, 0.0).groupby(cust, observed=True).sum(),
+        "avg_dpd": sdf["days_past_due"].where(over_open).groupby(cust, observed=True).mean().fillna(0).astype("int64"),
+        "oldest_dpd": sdf["days_past_due"].where(over_open).groupby(cust, observed=True).max().fillna(0).astype("int64"),
+    })
+    stops = sizes.cumsum()
+    agg["start"] = (stops - sizes).astype("int64")
+    agg["stop"] = stops.astype("int64")
+
+    # Largest overdue invoice; ties go to the earliest export row (index kept from df)
+    top = (
+        sdf.loc[overdue, ["customer", "num", "amount"]]
+        .rename_axis("_pos").reset_index()
+        .sort_values(["amount", "_pos"], ascending=[False, True], kind="stable")
+        .drop_duplicates("customer")
+        .set_index("customer")
+    )
+    agg["largest_overdue_num"] = top["num"].reindex(agg.index)
+    agg["largest_overdue_amount"] = top["amount"].reindex(agg.index)
+
+    bucket_sums = (
+        sdf.groupby(["customer", "bucket"], observed=True)["amount"].sum()
+        .unstack(fill_value=0.0)
+        .reindex(index=agg.index, columns=BUCKET_CANON, fill_value=0.0)
+    )
+    return sdf, agg.join(bucket_sums)
+
+
+# Template row keys -> source columns (formatted columns are added before partitioning)
+_ROW_FIELDS = {
+    "type": "type",
+    "num": "num",
+    "invoice_date": "invoice_date_fmt",
+    "due_date": "due_date_fmt",
+    "terms": "terms",
+    "po": "po",
+    "amount": "amount",
+    "amount_fmt": "amount_fmt",
+    "bucket": "bucket",
+    "days_past_due": "days_past_due",
+    "is_overdue": "is_overdue",
+}
+
+
+def _add_row_formats(df: pd.DataFrame) -> None:
+    """Format statement display columns for the whole frame at once (in place)."""
+    df["invoice_date_fmt"] = fmt_date_series(df["invoice_date"])
+    df["due_date_fmt"] = fmt_date_series(df["due_date"])
+    df["amount_fmt"] = fmt_money_series(df["amount"])
+
+
+def _statement_records(sdf: pd.DataFrame) -> list[dict]:
+    """Row dicts for STATEMENT_HTML in sdf order; slice with a customer's start/stop."""
+    view = sdf[list(_ROW_FIELDS.values())].set_axis(list(_ROW_FIELDS), axis=1)
+    return view.to_dict("records")
+
+
+# ---------- Rendering (serial or process pool) ----------
+# Named templates so Jinja's bytecode cache can key them (from_string() bypasses the cache).
+# default=True keeps every template autoescaped, exactly as from_string() did.
+_TEMPLATE_SOURCES = {"index.html": INDEX_HTML, "statement.html": STATEMENT_HTML, "email.txt": EMAIL_TXT,
+                     "batch.html": BATCH_INDEX_HTML}
+TEMPLATE_CACHE_DIR = Path(".cache") / "jinja"  # relative to the output root
+
+
+@lru_cache(maxsize=None)
+def _jinja_env(cache_dir: Path | None = None) -> Environment:
+    """Template environment; with cache_dir, compiled bytecode persists across runs and is
+    invalidated automatically when a template's source changes (checksum-keyed).
+    One environment per cache_dir and process, so repeated builds (watch mode) reuse compiled templates."""
+    bcc = None
+    if cache_dir is not None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        bcc = FileSystemBytecodeCache(str(cache_dir))
+    return Environment(loader=DictLoader(_TEMPLATE_SOURCES), bytecode_cache=bcc,
+                       autoescape=select_autoescape(default_for_string=True, default=True))
+
+
+# Per-process render state; filled once by _init_render (in each pool worker, or in-process)
+_render_ctx: dict = {}
+
+
+def _init_render(company: Company, as_of: date, cache_dir: Path | None = None) -> None:
+    """Load STATEMENT_HTML / EMAIL_TXT once for this process (from bytecode cache when warm)."""
+    env = _jinja_env(cache_dir)
+    _render_ctx.update(
+        company=company, as_of=as_of.isoformat(),
+        statement=env.get_template("statement.html"), email=env.get_template("email.txt"),
+    )
+
+
+class _TimedWriter:
+    """File wrapper that accumulates time spent in write(), to split streamed render vs I/O."""
+
+    def __init__(self, f):
+        self.f = f
+        self.seconds = 0.0
+
+    def write(self, s: str) -> None:
+        t0 = time.perf_counter()
+        self.f.write(s)
+        self.seconds += time.perf_counter() - t0
+
+
+@contextmanager
+def _replacing(path: Path):
+    """Text file streamed into a sibling .tmp and renamed over path once complete,
+    so an interrupted write never leaves a partial file that looks current."""
+    tmp = path.with_name(path.name + ".tmp")
     try:
-        if pd.notna(dpd):
-            return bucketize(int(float(dpd)))
-    except Exception:
-        pass
+        with open(tmp, "w", encoding="utf-8") as f:
+            yield f
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def _statement_stream(job: dict):
+    ctx = _render_ctx
+    stream = ctx["statement"].stream(
+        company=ctx["company"], as_of=ctx["as_of"],
+        customer=job["customer"], metrics=job["metrics"], rows=job["rows"],
+        total_due_fmt=job["total_due_fmt"],
+        buckets=BUCKET_CANON,
+        bucket_totals=job["bucket_totals"],
+    )
+    stream.enable_buffering(512)  # events per write, not bytes
+    return stream
+
+
+def _email_text(job: dict) -> str:
+    ctx = _render_ctx
+    email_txt = ctx["email"].render(company=ctx["company"], as_of=ctx["as_of"], customer=job["customer"],
+                                    total_due_fmt=job["total_due_fmt"])
+    return textwrap.dedent(email_txt).strip()
+
+
+@lru_cache(maxsize=None)
+def _text_env() -> Environment:
+    """Email text for sending (mailer.py): rendered without HTML autoescaping."""
+    return Environment(loader=DictLoader({"email.txt": EMAIL_TXT}), autoescape=False)
+
 
-    # Step 2: Try raw aging value as a number
-    s = clean_str(raw_aging)
+def email_message(company: Company, as_of: date, customer: str, total_due_fmt: str) -> tuple[str, str]:
+    """(subject, body) of one customer's statement email, as plain text.
+    email_template.txt is rendered by the autoescaped HTML environment, so it isn't reused for sending."""
+    text = _text_env().get_template("email.txt").render(company=company, as_of=as_of.isoformat(),
+                                                        customer=customer, total_due_fmt=total_due_fmt)
+    subject, _, body = textwrap.dedent(text).strip().partition("\n")
+    return subject.removeprefix("Subject:").strip(), body.strip() + "\n"
+
+
+def _render_customer(job: dict) -> tuple[str, float, float]:
+    """Render + write one customer's statement and email template -> (customer, render_s, write_s).
+    The statement streams to disk (no full in-memory copy); both files replace the old ones only when complete."""
+    t0 = time.perf_counter()
+    job["cust_dir"].mkdir(parents=True, exist_ok=True)
+    with _replacing(job["statement_path"]) as f:
+        out = _TimedWriter(f)
+        _statement_stream(job).dump(out)
+
+    # Email template: overwrite to most recent only
+    email_txt = _email_text(job)
+    t1 = time.perf_counter()
+    with _replacing(job["cust_dir"] / "email_template.txt") as f:
+        f.write(email_txt)
+    write_s = out.seconds + time.perf_counter() - t1
+    return job["customer"], time.perf_counter() - t0 - write_s, write_s
+
+
+def _render_customer_files(job: dict) -> tuple[str, float, list[tuple[Path, bytes]]]:
+    """Bundle mode: render without touching disk -> (customer, render_s, [(path, content)])."""
+    t0 = time.perf_counter()
+    files = [
+        (job["statement_path"], "".join(_statement_stream(job)).encode("utf-8")),
+        (job["cust_dir"] / "email_template.txt", _email_text(job).encode("utf-8")),
+    ]
+    return job["customer"], time.perf_counter() - t0, files
+
+
+@contextmanager
+def _renderer(company: Company, as_of: date, workers: int = 1, cache_dir: Path | None = None,
+              render_one=_render_customer):
+    """Yield render(jobs) -> [render_one(job) for each job], in job order
+    ((customer, render_s, write_s) for the default _render_customer).
+    workers > 1 keeps one process pool for every batch (same files either way).
+    """
+    if workers <= 1:
+        _init_render(company, as_of, cache_dir)
+        yield lambda jobs: [render_one(job) for job in jobs]
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_render,
+                             initargs=(company, as_of, cache_dir)) as pool:
+        def render(jobs: list[dict]) -> list[tuple]:
+            return list(pool.map(render_one, jobs, chunksize=max(1, len(jobs) // (workers * 8))))
+        yield render
+
+
+# ---------- Incremental builds: manifest of what each customer was last rendered from ----------
+MANIFEST_NAME = "_build_manifest.json"
+REPORT_NAME = "_run_report.json"
+
+
+def _digest(obj) -> str:
+    return hashlib.blake2b(json.dumps(obj, sort_keys=True, default=str).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _build_version(company: Company, as_of: date) -> str:
+    """Anything that changes every statement: as-of date, branding and template source."""
+    return _digest({"as_of": as_of.isoformat(), "company": asdict(company),
+                    "templates": [STATEMENT_HTML, EMAIL_TXT]})
+
+
+def _job_digest(job: dict) -> str:
+    """Content hash of everything one customer's statement/email is rendered from."""
+    return _digest({k: job[k] for k in ("customer", "statement_path", "metrics", "rows",
+                                        "total_due_fmt", "bucket_totals")})
+
+
+def _load_manifest(path: Path, version: str) -> dict:
+    """Previous customer -> digest map, or {} if missing/unreadable/built from another version."""
     try:
-        return bucketize(int(float(s)))
-    except Exception:
-        return BUCKET_CANON[0]
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data.get("customers", {}) if data.get("version") == version else {}
 
 
-def _avg_int(series: pd.Series) -> int:
-    """Safe integer average; returns 0 for empty/NaN."""
-    if series is None or series.empty:
-        return 0
-    m = pd.to_numeric(series, errors="coerce").mean()
-    return int(m) if pd.notna(m) else 0
+def _save_manifest(path: Path, version: str, customers: dict) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"version": version, "customers": customers}, indent=1, sort_keys=True),
+                   encoding="utf-8")
+    tmp.replace(path)
 
 
-# ---------- Main build (no arguments; fully self-contained) ----------
-def build_all() -> None:
-    as_of = date.today()
-    company = Company()  # branding from config.py
+def _is_current(job: dict, previous: dict) -> bool:
+    return (previous.get(job["customer"]) == job["digest"]
+            and job["statement_path"].exists()
+            and (job["cust_dir"] / "email_template.txt").exists())
 
-    # Persistent root: fixed folder
-    base_root = Path("Customer_Statements").resolve()
-    base_root.mkdir(parents=True, exist_ok=True)
 
-    # Input CSV (auto-detect only)
-    input_csv = autodetect_csv([Path.cwd(), Path.cwd() / "input", Path.home() / "Downloads"])
-    if not input_csv:
-        raise SystemExit("No CSV found.")
-    input_csv = Path(input_csv)
+# ---------- Ingest: load, normalize, filter ----------
+# Columns kept per detail row after filtering (everything downstream needs only these)
+_DETAIL_COLS = ["customer", "type", "num", "po", "terms", "invoice_date", "due_date",
+                "amount", "days_past_due", "bucket"]
+# Compact in-memory detail: repeated text dictionary-encoded, day counts in 32 bits.
+# num stays a string column (nearly unique per row, so a dictionary would only add codes).
+_COMPACT_DTYPES = {"customer": "category", "type": "category", "po": "category", "terms": "category",
+                   "bucket": "category", "days_past_due": "int32"}
+
+# Normalized-ingest snapshots, relative to the output root
+CACHE_DIR = Path(".cache") / "ingest"
+
+# Streaming ingest: kept rows held in memory before spilling to hashed customer partitions
+SPILL_ROWS = 500_000
+SPILL_PARTS = 64  # partitions per spill round; split further once the spilled total needs more
+
+
+def _read_csv(input_csv: Path, **kw):
+    return pd.read_csv(input_csv, dtype=str, encoding="utf-8-sig", on_bad_lines="skip", **kw)
 
-    # Load raw
-    raw0 = pd.read_csv(input_csv, dtype=str, encoding="utf-8-sig", on_bad_lines="skip")
-    raw0.columns = [c.strip() for c in raw0.columns]
 
+def _resolve_columns(raw0: pd.DataFrame) -> dict:
+    """Map ALIASES keys to actual export columns; exits if a critical one is missing."""
     cols = {k: pick(raw0, v) for k, v in ALIASES.items()}
     for critical in ("name", "type", "open_balance"):
         if not cols[critical]:
             raise SystemExit(f"Missing required column for '{critical}'. Found columns: {list(raw0.columns)}")
+    return cols
+
+
+# ---------- Ingest engine: header sniff + projected Arrow reader ----------
+ARROW_BLOCK_BYTES = 16 << 20  # Arrow parses blocks of this size in parallel
+# Cells pd.read_csv reads as missing by default (its na_values documentation), for the Arrow reader
+NA_STRINGS = sorted({
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+})
+
+
+def _sniff_header(input_csv: Path) -> tuple[list[str], dict, list[str]]:
+    """Header row only -> (export column names, resolved ALIASES, columns to read).
+    Names are pandas-style (blank -> 'Unnamed: i', duplicates -> '.1') and unstripped.
+    Reads the resolved columns plus QuickBooks' unnamed label columns (section/subtotal text in _rejected_rows.csv).
+    """
+    names = list(pd.read_csv(input_csv, nrows=0, encoding="utf-8-sig").columns)
+    cols = _resolve_columns(pd.DataFrame(columns=[c.strip() for c in names]))
+    wanted = {c for c in cols.values() if c}
+    return names, cols, [c for c in names if c.strip() in wanted or c.startswith("Unnamed: ")]
 
-    # Normalize working df
+
+def _bad_line(row) -> str:
+    # Too many fields: skipped, like on_bad_lines="skip". Too few: pandas pads those, so Arrow stops
+    # and _read_export lets pandas read the rest.
+    return "skip" if row.actual_columns > row.expected_columns else "error"
+
+
+def _arrow_frame(input_csv: Path, names: list[str], usecols: list[str]) -> pd.DataFrame:
+    """Projected string frame of the whole export via Arrow's multithreaded reader, same cells as _read_csv."""
+    return pa_csv.read_csv(
+        input_csv,
+        read_options=pa_csv.ReadOptions(column_names=names, skip_rows=1, block_size=ARROW_BLOCK_BYTES),
+        parse_options=pa_csv.ParseOptions(invalid_row_handler=_bad_line),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=usecols, column_types={c: pa.string() for c in usecols},
+            strings_can_be_null=True, null_values=NA_STRINGS),
+    ).to_pandas()
+
+
+def _read_export(input_csv: Path, names: list[str], usecols: list[str], chunksize: int = 0):
+    """Yield the export's projected columns as string frames (one frame unless chunksize);
+    the index is the row's position among the export's data rows.
+    A whole-file read goes through Arrow; from a malformed line it can't match pandas on, pandas reads it.
+    Chunked reads use pandas' chunk reader: Arrow's streaming reader buffers blocks well ahead of the
+    consumer, so its memory would grow with the export instead of the chunk size.
+    """
+    if pa is not None and not chunksize:
+        try:
+            yield _arrow_frame(input_csv, names, usecols)
+            return
+        except pa.ArrowInvalid as err:
+            print(f"ℹ️  {input_csv.name}: {str(err).splitlines()[0]}; reading it with pandas")
+    if not chunksize:
+        yield _read_csv(input_csv)[usecols]
+        return
+    with _read_csv(input_csv, chunksize=chunksize) as reader:  # no usecols: it stops skipping long lines
+        for raw in reader:
+            yield raw[usecols]
+
+
+def _normalize(raw0: pd.DataFrame, cols: dict, as_of: date) -> pd.DataFrame:
+    """Raw export rows -> working frame (raw columns + normalized ones)."""
     df0 = raw0.copy()
-    df0["customer"] = df0[cols["name"]].map(clean_str)
-    df0["type"] = df0[cols["type"]].map(clean_str)
-    df0["num"] = df0[cols["num"]].map(clean_str) if cols["num"] else ""
-    df0["po"] = df0[cols["po"]].map(clean_str) if cols["po"] else ""
-    df0["terms"] = df0[cols["terms"]].map(clean_str) if cols["terms"] else ""
-    df0["invoice_date"] = pd.to_datetime(df0[cols["date"]], errors="coerce") if cols["date"] else pd.NaT
-    df0["due_date"] = pd.to_datetime(df0[cols["due_date"]], errors="coerce") if cols["due_date"] else pd.NaT
-    df0["amount"] = df0[cols["open_balance"]].map(parse_money).astype(float)
+    df0["customer"] = clean_str_series(df0[cols["name"]])
+    df0["type"] = clean_str_series(df0[cols["type"]])
+    df0["num"] = clean_str_series(df0[cols["num"]]) if cols["num"] else ""
+    df0["po"] = clean_str_series(df0[cols["po"]]) if cols["po"] else ""
+    df0["terms"] = clean_str_series(df0[cols["terms"]]) if cols["terms"] else ""
+    df0["invoice_date"] = parse_date_series(df0[cols["date"]]) if cols["date"] else pd.NaT
+    df0["due_date"] = parse_date_series(df0[cols["due_date"]]) if cols["due_date"] else pd.NaT
+    df0["amount"] = parse_money_series(df0[cols["open_balance"]])
 
     # --- DPD & Age (compute first, then clamp) ---
     dpd_supplied = (
@@ -118,166 +472,620 @@ def build_all() -> None:
 
     # Buckets
     if cols.get("aging"):
-        df0["bucket"] = [_normalize_bucket(a, d) for a, d in zip(df0[cols["aging"]], df0["days_past_due"])]
+        df0["bucket"] = _normalize_buckets(df0[cols["aging"]], df0["days_past_due"])
     else:
-        df0["bucket"] = df0["days_past_due"].map(bucketize)
+        df0["bucket"] = bucketize_series(df0["days_past_due"])
 
     # Clean text cols (no literal "nan")
     for c in ["customer", "type", "num", "po", "terms", "bucket"]:
         df0[c] = df0.get(c, "").fillna("").astype(str).str.strip()
+    return df0
 
-    # STRICT FILTERS: only real invoice/credit detail
-    reasons = []
-    keep = pd.Series(True, index=df0.index)
-
-    m = df0["customer"].str.len() > 0
-    reasons.append(("blank_customer", ~m))
-    keep &= m
-
-    m = df0["type"].str.len() > 0
-    reasons.append(("blank_type", ~m))
-    keep &= m
-
-    type_norm = df0["type"].str.lower()
-    m = type_norm.str.contains(r"(?:invoice|credit)", regex=True, na=False)
-    reasons.append(("non_invoice_or_credit", ~m))
-    keep &= m
-
-    m = (df0["num"].str.len() > 0) | df0["invoice_date"].notna() | df0["due_date"].notna()
-    reasons.append(("no_num_and_no_dates", ~m))
-    keep &= m
-
-    m = df0["amount"].notna() & (df0["amount"].abs() > 1e-6)
-    reasons.append(("zero_or_nan_amount", ~m))
-    keep &= m
-
-    dropped = int((~keep).sum())
-    if dropped:
-        rej = df0.loc[~keep].copy()
-        rej["reject_reason"] = ""
-        for name, mm in reasons:
-            rej.loc[rej["reject_reason"].eq("") & mm.loc[rej.index], "reject_reason"] = name
-        (base_root / "_rejected_rows.csv").write_text(rej.to_csv(index=False), encoding="utf-8")
-        print(f"⚠️  Dropped {dropped} non-detail rows. See {base_root / '_rejected_rows.csv'}")
-
-    df = df0.loc[keep].copy()
-    if df.empty:
-        raise SystemExit("No valid invoice/credit rows after filtering. Check your export.")
-
-    df["is_overdue"] = df["days_past_due"] > 0
-
-    # Jinja env
-    env = Environment(loader=BaseLoader(), autoescape=select_autoescape())
-    t_statement = env.from_string(STATEMENT_HTML)
-    t_email = env.from_string(EMAIL_TXT)
-
-    # Per-customer generation
-    summaries = []
-    for cust in sorted(df["customer"].dropna().unique()):
-        cdf = df.loc[df["customer"].eq(cust)].copy()
-        cust_dir = base_root / clean_folder_name(cust)
-        cust_dir.mkdir(parents=True, exist_ok=True)
-
-        total_due = float(cdf["amount"].sum())
-        bucket_sums = cdf.groupby("bucket")["amount"].sum().reindex(BUCKET_CANON, fill_value=0.0)
-        overdue_total = float(cdf.loc[cdf["is_overdue"], "amount"].sum())
 
-        # Minimal, collector-focused metrics
-        open_mask = cdf["amount"] > 0
-        over_mask = cdf["is_overdue"] & open_mask
+# Strict filters in check order; bit i of the reject flags = filter i failed
+REJECT_REASONS = ["blank_customer", "blank_type", "non_invoice_or_credit", "no_num_and_no_dates",
+                  "zero_or_nan_amount"]
+
 
-        avg_dpd = _avg_int(cdf.loc[over_mask, "days_past_due"])
-        oldest_past_due = int(cdf.loc[over_mask, "days_past_due"].max()) if over_mask.any() else 0
+def _reject_reasons(df0: pd.DataFrame) -> tuple[pd.Series, pd.Series]:
+    """STRICT FILTERS: only real invoice/credit detail.
+    Returns (keep, flags): flags is a uint8 bitset per row over REJECT_REASONS (0 = kept)."""
+    failed = [
+        df0["customer"].str.len() == 0,
+        df0["type"].str.len() == 0,
+        ~df0["type"].str.lower().str.contains(r"(?:invoice|credit)", regex=True, na=False),
+        ~((df0["num"].str.len() > 0) | df0["invoice_date"].notna() | df0["due_date"].notna()),
+        ~(df0["amount"].notna() & (df0["amount"].abs() > 1e-6)),
+    ]
+    flags = np.zeros(len(df0), dtype=np.uint8)
+    for bit, m in enumerate(failed):
+        flags |= m.to_numpy(dtype=bool) << np.uint8(bit)
+    flags = pd.Series(flags, index=df0.index)
+    return flags.eq(0), flags
 
-        overdue_sorted = cdf[cdf["is_overdue"]].sort_values("amount", ascending=False)
+
+# Flags value -> position of its lowest set bit in REJECT_REASONS (the first failing filter); -1 = kept
+_FIRST_FAILED = np.array([(v & -v).bit_length() - 1 for v in range(1 << len(REJECT_REASONS))], dtype=np.int8)
+_REASON_LABELS = np.array(REJECT_REASONS, dtype=object)
+
+
+REJECTS_SUMMARY_NAME = "_rejected_summary.json"
+REJECT_SAMPLES = 5  # example rows per reason in the summary
+REJECT_WRITE_ROWS = 100_000  # rejected rows formatted per to_csv call
+
+
+class _RejectLog:
+    """Streams rejected rows to rejected_path (created on the first one) and tallies them;
+    finish() writes per-reason counts plus a few sample rows to _rejected_summary.json alongside."""
+
+    def __init__(self, rejected_path: Path):
+        self.path = rejected_path
+        self.f = None
+        self.rows = 0
+        self.counts = np.zeros(len(REJECT_REASONS), dtype=np.int64)
+        self.samples: dict[str, list] = {r: [] for r in REJECT_REASONS}
+
+    def add(self, df0: pd.DataFrame, keep: pd.Series, flags: pd.Series) -> int:
+        """Record one frame's rejected rows; returns how many."""
+        dropped = np.flatnonzero(~keep.to_numpy())
+        if not len(dropped):
+            return 0
+        first = _FIRST_FAILED[flags.to_numpy()[dropped]]
+        self.counts += np.bincount(first, minlength=len(REJECT_REASONS))
+        if self.f is None:
+            self.f = open(self.path, "w", encoding="utf-8", newline="")
+        for start in range(0, len(dropped), REJECT_WRITE_ROWS):
+            part = slice(start, start + REJECT_WRITE_ROWS)
+            rej = df0.iloc[dropped[part]].assign(reject_reason=_REASON_LABELS[first[part]])
+            rej.to_csv(self.f, index=False, header=not self.rows)
+            self.rows += len(rej)
+        for i, name in enumerate(REJECT_REASONS):
+            need = REJECT_SAMPLES - len(self.samples[name])
+            if need > 0:
+                rows = df0.iloc[dropped[first == i][:need]]
+                rows = rows.assign(**{c: fmt_date_series(rows[c]) for c in ("invoice_date", "due_date")})
+                self.samples[name] += json.loads(rows.to_json(orient="records"))
+        return len(dropped)
+
+    def close(self) -> None:
+        if self.f:
+            self.f.close()
+
+    def finish(self) -> dict:
+        self.close()
+        if not self.rows:  # no stale file from an earlier export
+            self.path.unlink(missing_ok=True)
+        summary = {
+            "rejected_rows": self.rows,
+            "reasons": {name: {"count": int(n), "sample": self.samples[name]}
+                        for name, n in zip(REJECT_REASONS, self.counts) if n},
+        }
+        self.path.with_name(REJECTS_SUMMARY_NAME).write_text(
+            json.dumps(summary, indent=1, ensure_ascii=False), encoding="utf-8")
+        return summary
+
+
+def _compact(detail: pd.DataFrame) -> pd.DataFrame:
+    """Detail frame in its compact in-memory form (see _COMPACT_DTYPES)."""
+    return detail.astype(_COMPACT_DTYPES)
+
+
+def _mb_per_million(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / max(len(df), 1) * 1e6 / 2 ** 20
+
+
+def _customer_hash(df: pd.DataFrame) -> np.ndarray:
+    return pd.util.hash_pandas_object(df["customer"], index=False).to_numpy()
+
+
+def _spill(held: list, spill_dir: Path, rnd: int) -> None:
+    """Write held detail rows to per-partition files; a customer always hashes to the same partition."""
+    df = pd.concat(held)
+    for k, pdf in df.groupby(_customer_hash(df) % SPILL_PARTS, sort=False):
+        pdf.to_pickle(spill_dir / f"p{k:06d}_{rnd:05d}.pkl")
+
+
+def _resplit(spill_dir: Path, fan: int) -> None:
+    """Split every partition fan ways on the same customer hash (partition k -> k + SPILL_PARTS * j),
+    one spill file at a time, so partitions stay near spill_rows however large the export."""
+    for f in list(spill_dir.glob("p*.pkl")):
+        df = pd.read_pickle(f)
+        f.unlink()
+        rnd = f.stem.split("_")[1]
+        for k, pdf in df.groupby(_customer_hash(df) % (SPILL_PARTS * fan), sort=False):
+            pdf.to_pickle(spill_dir / f"p{k:06d}_{rnd}.pkl")
+
+
+def _load_partition(files: list) -> pd.DataFrame:
+    return pd.concat([pd.read_pickle(f) for f in sorted(files)])
+
+
+def _ingest(input_csv: Path, as_of: date, rejected_path: Path, chunksize: int = 0,
+            spill_dir: Path | None = None, spill_rows: int | None = None,
+            report: RunReport | None = None) -> tuple[list, int]:
+    """Load, normalize and filter the export; rejected rows stream to rejected_path
+    (per-reason counts and samples in _rejected_summary.json next to it).
+    chunksize=0 reads the whole file at once. Otherwise chunks are normalized and filtered one at a time,
+    and kept rows spill to spill_dir (hashed by customer) past spill_rows. Each returned batch holds about
+    spill_rows rows whatever the export size (a single customer is never split).
+    Returns (batches, dropped): zero-arg loaders of detail frames; no customer spans two batches.
+    """
+    report = report or RunReport()
+    with report.phase("read"):
+        names, cols, usecols = _sniff_header(input_csv)
+    if not chunksize:
+        with report.phase("read") as p:
+            [raw0] = _read_export(input_csv, names, usecols)
+            raw0.columns = [c.strip() for c in raw0.columns]
+            p["rows"] += len(raw0)
+        with report.phase("normalize") as p:
+            df0 = _normalize(raw0, cols, as_of)
+            p["rows"] += len(df0)
+        with report.phase("filter") as p:
+            keep, flags = _reject_reasons(df0)
+            rejects = _RejectLog(rejected_path)
+            try:
+                dropped = rejects.add(df0, keep, flags)
+            finally:
+                rejects.close()
+            rejects.finish()
+            df = df0.loc[keep, _DETAIL_COLS]
+            p["rows"] += len(df)
+        return ([lambda: df] if len(df) else []), dropped
+
+    spill_rows = spill_rows or SPILL_ROWS
+    rejects, dropped = _RejectLog(rejected_path), 0
+    held, held_rows, rounds, spilled = [], 0, 0, 0
+    reader = _read_export(input_csv, names, usecols, chunksize)
+    try:
+        while True:
+            with report.phase("read") as p:
+                raw0 = next(reader, None)
+                if raw0 is None:
+                    break
+                raw0.columns = [c.strip() for c in raw0.columns]
+                p["rows"] += len(raw0)
+            with report.phase("normalize") as p:
+                df0 = _normalize(raw0, cols, as_of)
+                p["rows"] += len(df0)
+            with report.phase("filter") as p:
+                keep, flags = _reject_reasons(df0)
+                dropped += rejects.add(df0, keep, flags)
+                if keep.any():
+                    held.append(df0.loc[keep, _DETAIL_COLS])
+                    held_rows += len(held[-1])
+                    p["rows"] += len(held[-1])
+            if spill_dir is not None and held_rows >= spill_rows:
+                with report.phase("spill") as p:
+                    _spill(held, spill_dir, rounds)
+                    p["rows"] += held_rows
+                held, held_rows, rounds, spilled = [], 0, rounds + 1, spilled + held_rows
+    finally:
+        reader.close()
+        rejects.close()
+    rejects.finish()
+
+    if not rounds:
+        return ([lambda: pd.concat(held)] if held else []), dropped
+    if held:
+        with report.phase("spill") as p:
+            _spill(held, spill_dir, rounds)
+            p["rows"] += held_rows
+        spilled += held_rows
+    fan = -(-spilled // (spill_rows * SPILL_PARTS))  # partitions of about spill_rows rows each
+    if fan > 1:
+        with report.phase("resplit") as p:
+            _resplit(spill_dir, fan)
+            p["rows"] += spilled
+    parts = {}
+    for f in spill_dir.glob("p*.pkl"):
+        parts.setdefault(f.name.split("_")[0], []).append(f)
+    return [lambda files=files: _load_partition(files) for _, files in sorted(parts.items())], dropped
+
+
+# ---------- Per-customer jobs + index ----------
+def statement_path(base_root: Path, customer: str, as_of: date) -> Path:
+    """<root>/<Customer folder>/<slug>_YYYYMMDD.html for one customer's statement on as_of."""
+    # Statement file: keep history by day; overwrite if same day
+    # Take first 3 words of customer name, slugify, date without dashes
+    cust_first3 = " ".join(customer.split()[:3])
+    return base_root / clean_folder_name(customer) / f"{slugify(cust_first3)}_{as_of.strftime('%Y%m%d')}.html"
+
+
+def bundle_path(base_root: Path, as_of: date, fmt: str) -> Path:
+    """<root>/statements_YYYYMMDD.zip (or .tar.gz): the --bundle archive of one day's run."""
+    return base_root / f"statements_{as_of.strftime('%Y%m%d')}{BUNDLE_FORMATS[fmt]}"
+
+
+def _customer_jobs(df: pd.DataFrame, base_root: Path, as_of: date) -> tuple[list, list]:
+    """Detail rows -> (render jobs, index summaries), both in customer order.
+    Each job's rows are a slice of one shared record list (no per-customer copies)."""
+    df = df.assign(is_overdue=df["days_past_due"] > 0)  # new columns only; detail itself isn't copied
+    _add_row_formats(df)
+
+    # Partition once: sorted frame + every per-customer aggregate
+    sdf, agg = _partition(df)
+    records = _statement_records(sdf)
+
+    jobs, summaries = [], []
+    for cust, a in agg.to_dict("index").items():
+        total_due = float(a["total_due"])
         largest_overdue = (
-            f"{overdue_sorted['num'].iat[0]} ({fmt_money(overdue_sorted['amount'].iat[0])})"
-            if not overdue_sorted.empty else "N/A"
+            f"{a['largest_overdue_num']} ({fmt_money(a['largest_overdue_amount'])})"
+            if a["overdue_invoices"] else "N/A"
         )
 
+        # Minimal, collector-focused metrics
         metrics = {
-            "Invoices": int(len(cdf)),
-            "Overdue invoices": int(cdf["is_overdue"].sum()),
-            "Avg days past due": avg_dpd,  # overdue only
-            "Oldest days past due": oldest_past_due,
+            "Invoices": int(a["invoices"]),
+            "Overdue invoices": int(a["overdue_invoices"]),
+            "Avg days past due": int(a["avg_dpd"]),  # overdue only
+            "Oldest days past due": int(a["oldest_dpd"]),
             "Total due": fmt_money(total_due),
-            "Overdue total": fmt_money(overdue_total),
+            "Overdue total": fmt_money(a["overdue_total"]),
             "Largest overdue invoice": largest_overdue,
         }
 
-        # Rows (sorted: overdue first, then oldest due first)
-        rows = []
-        cdf = cdf.sort_values(["is_overdue", "due_date", "invoice_date", "num"], ascending=[False, True, True, True])
-        for _, r in cdf.iterrows():
-            rows.append({
-                "type": r["type"],
-                "num": r["num"],
-                "invoice_date": "" if pd.isna(r["invoice_date"]) else r["invoice_date"].date().isoformat(),
-                "due_date": "" if pd.isna(r["due_date"]) else r["due_date"].date().isoformat(),
-                "terms": r["terms"],
-                "po": r["po"],
-                "amount": float(r["amount"]),
-                "amount_fmt": fmt_money(r["amount"]),
-                "bucket": r["bucket"],
-                "days_past_due": int(r["days_past_due"]),
-                "is_overdue": bool(r["is_overdue"]),
-            })
-
-        # Statement file: keep history by day; overwrite if same day
-        # Take first 3 words of customer name, slugify, date without dashes
-        cust_words = cust.split()[:3]
-        cust_first3 = " ".join(cust_words)
-
-        cust_slug = slugify(cust_first3)
-        date_str = as_of.strftime("%Y%m%d")
-        statement_name = f"{cust_slug}_{date_str}.html"
-        statement_path = cust_dir / statement_name
-
-        html = t_statement.render(
-            company=company, as_of=as_of.isoformat(),
-            customer=cust, metrics=metrics, rows=rows,
-            total_due_fmt=fmt_money(total_due),
-            buckets=BUCKET_CANON,
-            bucket_totals={b: fmt_money(bucket_sums[b]) for b in BUCKET_CANON},
-        )
-        statement_path.write_text(html, encoding="utf-8")
-
-        # Email template: overwrite to most recent only
-        email_txt = t_email.render(company=company, as_of=as_of.isoformat(), customer=cust,
-                                   total_due_fmt=fmt_money(total_due))
-        (cust_dir / "email_template.txt").write_text(textwrap.dedent(email_txt).strip(), encoding="utf-8")
-
+        path = statement_path(base_root, cust, as_of)
+        jobs.append({
+            "customer": cust,
+            "cust_dir": path.parent,
+            "statement_path": path,
+            "metrics": metrics,
+            # Rows (already sorted: overdue first, then oldest due first)
+            "rows": records[a["start"]:a["stop"]],
+            "total_due_fmt": fmt_money(total_due),
+            "bucket_totals": {b: fmt_money(a[b]) for b in BUCKET_CANON},
+        })
         summaries.append({
             "Customer": cust,
             "As Of": as_of.isoformat(),
-            "Statement": str(statement_path),
-            **{b: float(bucket_sums[b]) for b in BUCKET_CANON},
+            "Statement": str(path),
+            **{b: float(a[b]) for b in BUCKET_CANON},
             "Total Due": total_due,
+            "Overdue Total": float(a["overdue_total"]),
+            "Overdue Invoices": int(a["overdue_invoices"]),
+            "Oldest Days Past Due": int(a["oldest_dpd"]),
         })
+    return jobs, summaries
 
-    if not summaries:
-        raise SystemExit("No billable rows after filtering. Check Open Balance parsing.")
 
-    # Sort and write top-level artifacts (overwrite each run)
+INDEX_DATA_NAME = "index_data.js"  # customer rows for index.html (a script, so it loads from file://)
+INDEX_PAGE_SIZE = 100
+
+
+def _write_index(summaries: list, base_root: Path, company: Company, as_of: date,
+                 cache_dir: Path | None = None, out_dir: Path | None = None) -> None:
+    # Sort and write top-level artifacts (overwrite each run); out_dir defaults to base_root
+    out_dir = out_dir or base_root
     summary = pd.DataFrame(summaries).sort_values(["Total Due", "Customer"], ascending=[False, True])
 
-    # Index (links to latest statements we just wrote)
-    rows = []
-    for _, r in summary.iterrows():
-        rel = os.path.relpath(r["Statement"], base_root).replace("\\", "/")
-        rows.append({"customer": r["Customer"], "rel_path": rel, "total_due_fmt": fmt_money(r["Total Due"])})
+    # Index rows (links to latest statements we just wrote), columnar to keep the file small
+    data = {
+        "c": summary["Customer"].tolist(),
+        "t": fmt_money_series(summary["Total Due"]).tolist(),
+        "p": [os.path.relpath(p, base_root).replace("\\", "/") for p in summary["Statement"]],
+    }
+    with open(out_dir / INDEX_DATA_NAME, "w", encoding="utf-8") as f:
+        f.write("window.INDEX_DATA=")
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        f.write(";\n")
 
     grand_total_raw = round(float(summary["Total Due"].sum()), 2)
-    index_html = env.from_string(INDEX_HTML).render(
-        company=company, as_of=as_of.isoformat(),
-        rows=rows, grand_total_fmt=fmt_money(grand_total_raw),
-        grand_total=grand_total_raw,
-    )
-    (base_root / "index.html").write_text(index_html, encoding="utf-8")
+    with open(out_dir / "index.html", "w", encoding="utf-8") as f:
+        _jinja_env(cache_dir).get_template("index.html").stream(
+            company=company, as_of=as_of.isoformat(),
+            data_src=INDEX_DATA_NAME, page_size=INDEX_PAGE_SIZE,
+            grand_total_fmt=fmt_money(grand_total_raw), grand_total=grand_total_raw,
+        ).dump(f)
+
+
+# ---------- Main build ----------
+def search_dirs() -> list[Path]:
+    """Where exports are auto-detected: the working folder, ./input and ~/Downloads."""
+    return [Path.cwd(), Path.cwd() / "input", Path.home() / "Downloads"]
+
+
+def build_all(workers: int = 1, force: bool = False, chunksize: int = 0,
+              use_cache: bool = True, clear_cache: bool = False, history: bool = True,
+              pdf: bool = False, bundle: str | None = None, input_csv: Path | None = None,
+              company: Company | None = None, output_root: Path | None = None,
+              template_cache: Path | None = None) -> RunReport:
+    """Build every statement, email template and the index.
+    workers > 1 renders/writes customers in a process pool.
+    Customers whose inputs match the build manifest are skipped unless force=True.
+    chunksize > 0 streams the export in chunks of that many lines (bounded memory).
+    use_cache reuses the normalized snapshot of an unchanged export (clear_cache wipes it first).
+    history appends today's rows and bucket sums to the _ar_history.sqlite store (see history.py).
+    pdf also renders each statement to PDF next to its HTML (WeasyPrint, same worker count).
+    bundle ("zip" or "tar") writes statements, templates and top-level artifacts into one archive
+    (statements_YYYYMMDD.zip / .tar.gz, see bundle.py) instead of the folder tree; every customer is rendered.
+    input_csv defaults to the best-looking CSV in search_dirs(); company to the config.py branding;
+    output_root to ./Customer_Statements; template_cache (compiled templates) to <output_root>/.cache/jinja.
+    Phase/customer timings go to _run_report.json next to index.html (also returned).
+    """
+    if pdf and not PDF_AVAILABLE:
+        raise SystemExit("--pdf needs WeasyPrint: pip install weasyprint (plus its Pango libraries).")
+    if pdf and bundle:
+        raise SystemExit("--pdf renders from the statement files; it can't be combined with --bundle.")
+    report = RunReport()
+    as_of = report.as_of = date.today()
+    company = company or Company()  # branding from config.py unless given (batch.py)
+
+    # Persistent root: fixed folder unless given
+    base_root = Path(output_root or "Customer_Statements").resolve()
+    base_root.mkdir(parents=True, exist_ok=True)
+    template_cache = template_cache or base_root / TEMPLATE_CACHE_DIR
+
+    # Input CSV (auto-detected unless given)
+    input_csv = input_csv or autodetect_csv(search_dirs())
+    if not input_csv:
+        raise SystemExit("No CSV found.")
+    input_csv = Path(input_csv)
+
+    version = _build_version(company, as_of)
+    manifest_path = base_root / MANIFEST_NAME
+    previous = {} if force or bundle else _load_manifest(manifest_path, version)
+
+    # Bundle mode: top-level artifacts are staged in a temp dir, then copied into the archive
+    sink, stage = None, None
+    if bundle:
+        sink = BundleWriter(bundle_path(base_root, as_of, bundle), bundle)
+        stage = tempfile.TemporaryDirectory(prefix="ar_bundle_")
+    out_dir = Path(stage.name) if stage else base_root
+
+    rejected_path = out_dir / "_rejected_rows.csv"
+    rejects_summary = out_dir / REJECTS_SUMMARY_NAME
+    cache = IngestCache(base_root / CACHE_DIR)
+    if clear_cache:
+        cache.clear()
+    with report.phase("cache_lookup"):
+        key = fingerprint(input_csv, as_of) if use_cache else None
+        hit = cache.lookup(key, [rejected_path, rejects_summary]) if key else None
+    snapshot = cache.writer(key) if key and not hit else None
+
+    with tempfile.TemporaryDirectory(prefix="ar_spill_") as spill_dir:
+        if hit:
+            batches, dropped = hit
+            print(f"♻️  Reusing normalized snapshot of {input_csv.name}")
+        else:
+            batches, dropped = _ingest(input_csv, as_of, rejected_path,
+                                       chunksize=chunksize, spill_dir=Path(spill_dir), report=report)
+        if dropped:
+            where = f"{sink.path.name} ({rejected_path.name})" if sink else rejected_path
+            print(f"⚠️  Dropped {dropped} non-detail rows. See {where}")
+            reasons = json.loads(rejects_summary.read_text(encoding="utf-8"))["reasons"]
+            print("   " + ", ".join(f"{name}: {r['count']}" for name, r in reasons.items()))
+            report.counts.update({f"dropped_{name}": r["count"] for name, r in reasons.items()})
+        if not batches:
+            if snapshot:
+                snapshot.discard()
+            if sink:
+                sink.discard()
+            raise SystemExit("No valid invoice/credit rows after filtering. Check your export.")
+
+        # Per batch: jobs + summaries, then render only customers whose content hash changed
+        summaries, digests, rebuilt = [], {}, 0
+        loaded_mb = compact_mb = 0.0  # detail frame memory, MB per million rows x rows
+        dashboard = DashboardPayload()
+        recorder = open_items = None
+        try:  # on any failure the history store, open-items index, cache and archive keep their previous state
+            recorder = HistoryStore(base_root / HISTORY_NAME).run(as_of) if history else None
+            open_items = InvoiceIndexWriter(base_root / INDEX_DB_NAME, as_of, company)
+            with _renderer(company, as_of, workers, template_cache,
+                           _render_customer_files if sink else _render_customer) as render:
+                for load in batches:
+                    with report.phase("load_batch") as p:
+                        detail = load()
+                        loaded_mb += _mb_per_million(detail) * len(detail)
+                        detail = _compact(detail)
+                        compact_mb += _mb_per_million(detail) * len(detail)
+                        if snapshot:
+                            snapshot.add(detail)
+                        dashboard.add_detail(detail)
+                        p["rows"] += len(detail)
+                    with report.phase("invoice_index") as p:
+                        open_items.add(detail)
+                        p["rows"] += len(detail)
+                    if recorder:
+                        with report.phase("history") as p:
+                            recorder.add(detail)
+                            p["rows"] += len(detail)
+                    with report.phase("aggregate") as p:
+                        jobs, batch_summaries = _customer_jobs(detail, base_root, as_of)
+                        p["rows"] += len(jobs)
+                    with report.phase("manifest_diff") as p:
+                        for job in jobs:
+                            job["digest"] = digests[job["customer"]] = _job_digest(job)
+                        todo = [job for job in jobs if not _is_current(job, previous)]
+                    with report.phase("render_write") as p:
+                        for timing in render(todo):
+                            if sink:  # main process is the only archive writer
+                                customer, render_s, files = timing
+                                t0 = time.perf_counter()
+                                for path, data in files:
+                                    sink.add(path.relative_to(base_root).as_posix(), data, customer)
+                                timing = customer, render_s, time.perf_counter() - t0
+                            report.add_customer(*timing)
+                        p["rows"] += len(todo)
+                    rebuilt += len(todo)
+                    summaries += batch_summaries
+        except BaseException:
+            for writer in (recorder, open_items, snapshot, sink):
+                if writer:
+                    writer.discard()
+            raise
+    if snapshot:
+        snapshot.commit(dropped, [rejected_path, rejects_summary])
+    if recorder:
+        recorder.commit()
+    with report.phase("invoice_index"):
+        open_items.commit()
+    removed = len(previous.keys() - digests.keys())
+    if not sink:  # the manifest describes the folder tree
+        _save_manifest(manifest_path, version, digests)
+
+    if not summaries:
+        raise SystemExit("No billable rows after filtering. Check Open Balance parsing.")
+
+    with report.phase("index") as p:
+        _write_index(summaries, base_root, company, as_of, template_cache, out_dir)
+        p["rows"] += len(summaries)
+    with report.phase("dashboard_payload") as p:
+        dashboard.write(out_dir / PAYLOAD_NAME, summaries, as_of)
+        p["rows"] += len(summaries)
+    if sink:
+        with report.phase("bundle") as p:
+            for name in ("index.html", INDEX_DATA_NAME, PAYLOAD_NAME, rejected_path.name, REJECTS_SUMMARY_NAME):
+                if (out_dir / name).exists():
+                    sink.add_file(name, out_dir / name)
+            stage.cleanup()
+            sink.commit()
+            p["rows"] += len(sink.members)
+        report.counts.update(bundle_members=len(sink.members), bundle_bytes=sink.path.stat().st_size)
+    if pdf:
+        with report.phase("pdf") as p:
+            pdfs, pages = render_pdfs([s["Statement"] for s in summaries], company.logo_src,
+                                      base_root / ASSET_DIR, workers, force)
+            p["rows"] += pages
+        report.counts.update(pdf_statements=pdfs, pdf_pages=pages)
+        pdf_s = report.phases["pdf"]["seconds"]
+        print(f"   PDF: {pdfs} statements, {pages} pages in {pdf_s:.1f}s "
+              f"({pages / pdf_s if pdf_s else 0:.1f} pages/s)")
+
+    detail_rows = report.phases["load_batch"]["rows"]
+    report.counts.update(customers=len(summaries), rebuilt=rebuilt, skipped=len(summaries) - rebuilt,
+                         removed=removed, dropped_rows=dropped, detail_rows=detail_rows)
+    report.totals.update({b: round(sum(s[b] for s in summaries), 2)
+                          for b in (*BUCKET_CANON, "Total Due", "Overdue Total")})
+    report.memory.update(detail_mb_per_million_rows=round(loaded_mb / detail_rows, 1),
+                         compact_mb_per_million_rows=round(compact_mb / detail_rows, 1))
+    report.write(base_root / REPORT_NAME)
+
+    if sink:
+        print(f"✅ Built {len(summaries)} statements into {sink.path}")
+        print(f"   {len(sink.members)} members, {sink.path.stat().st_size / 1e6:.1f} MB")
+    else:
+        print(f"✅ Built {len(summaries)} statements into {base_root}")
+        print(f"   Rebuilt {rebuilt}, skipped {len(summaries) - rebuilt} unchanged, removed {removed}")
+        print(f"   Open: {(base_root / 'index.html')}")
+    print(f"   Detail frame: {report.memory['detail_mb_per_million_rows']:.1f} MB per million rows as loaded, "
+          f"{report.memory['compact_mb_per_million_rows']:.1f} MB compact")
+    return report
+
+
+# ---------- Statements on demand (no full build) ----------
+def render_from_index(customers: list[str] | None = None, bucket: str | None = None,
+                      min_balance: float | None = None, output_root: Path | None = None) -> list[Path]:
+    """Re-render statements + email templates for matching customers from the open-items index
+    written by the last build_all into output_root (default ./Customer_Statements): same as-of date,
+    branding and file names. Returns the statement paths.
+    """
+    base_root = Path(output_root or "Customer_Statements").resolve()
+    try:
+        index = InvoiceIndex(base_root / INDEX_DB_NAME)
+    except FileNotFoundError:
+        raise SystemExit(f"No open-items index in {base_root} yet. Run a full build first.")
+    as_of = index.as_of()
+    built_into = index.output_root()
+    if built_into and built_into != base_root:
+        print(f"⚠️  Index was built into {built_into}; rendering into {base_root}")
+    names = index.customers(customers, bucket, min_balance)
+    if not names:
+        raise SystemExit("No customers match.")
+
+    jobs, _ = _customer_jobs(index.rows(names), base_root, as_of)
+    _init_render(index.company(), as_of, base_root / TEMPLATE_CACHE_DIR)
+    for job in jobs:
+        _render_customer(job)
+        print(f"   {job['statement_path']}")
+    print(f"✅ Rendered {len(jobs)} statements as of {as_of}")
+    return [job["statement_path"] for job in jobs]
+
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description="Build NETC AR customer statements.")
+    sub = ap.add_subparsers(dest="command", metavar="{render,watch,batch}",
+                            help="optional: 'render' re-renders selected statements from the last build; "
+                                 "'watch' rebuilds whenever a new export lands; "
+                                 "'batch' builds several entities from a jobs file")
+    one = sub.add_parser("render", help="re-render selected customers from the open-items index (no full build)")
+    one.add_argument("--customer", action="append", default=None,
+                     help="customer name (repeatable); default all customers passing the other filters")
+    one.add_argument("--bucket", choices=BUCKET_CANON, default=None,
+                     help="only customers with a balance in this aging bucket")
+    one.add_argument("--min-balance", type=float, default=None,
+                     help="only customers whose balance (in --bucket if given, else total) exceeds this")
+    one.add_argument("--output-root", type=Path, default=None,
+                     help="output root of the build to re-render from (default Customer_Statements; "
+                          "a batch entity's \"output\" folder)")
+    mon = sub.add_parser("watch", help="stay running and rebuild (with the options given before 'watch') "
+                                       "whenever a new or changed export lands")
+    mon.add_argument("--interval", type=float, default=1.0, help="seconds between polls (default 1)")
+    mon.add_argument("--settle", type=float, default=2.0,
+                     help="seconds an export must stay unchanged before it is built (default 2)")
+    mon.add_argument("--max-builds", type=int, default=None, help="stop after N builds (default: run until Ctrl+C)")
+    multi = sub.add_parser("batch", help="build every entity (branding, export, output root) listed in a JSON "
+                                         "jobs file with the options given before 'batch' (see batch.py)")
+    multi.add_argument("jobs", type=Path, help="JSON list of {entity, export, output, company}")
+    multi.add_argument("--processes", type=int, default=None,
+                       help="entities built at once (default: one per CPU core, at most one per entity)")
+    multi.add_argument("--summary-root", type=Path, default=Path("Customer_Statements_All"),
+                       help="folder for the consolidated index.html + _batch_summary.json")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="render/write statements in N processes (default 1 = serial)")
+    ap.add_argument("--force", action="store_true",
+                    help="re-render every customer, ignoring the build manifest")
+    ap.add_argument("--chunksize", type=int, default=0,
+                    help="stream the export N lines at a time with bounded memory (default 0 = load whole file)")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="always re-parse the export instead of reusing its normalized snapshot")
+    ap.add_argument("--clear-cache", action="store_true",
+                    help="delete all normalized-ingest snapshots before building")
+    ap.add_argument("--pdf", action="store_true",
+                    help="also render every statement to PDF next to its HTML (needs WeasyPrint)")
+    ap.add_argument("--bundle", choices=list(BUNDLE_FORMATS), default=None,
+                    help="write the run into one archive (statements_YYYYMMDD.zip / .tar.gz) instead of folders")
+    ap.add_argument("--no-history", action="store_true",
+                    help="don't record this run in the historical AR store (_ar_history.sqlite)")
+    ap.add_argument("--profile", type=Path, nargs="?", const=Path("Customer_Statements") / "_build.prof",
+                    default=None, metavar="FILE",
+                    help="run under cProfile and dump stats (default Customer_Statements/_build.prof)")
+    args = ap.parse_args(argv)
+    if args.command == "render":
+        render_from_index(args.customer, args.bucket, args.min_balance, args.output_root)
+        return
+
+    options = dict(workers=args.workers, force=args.force, chunksize=args.chunksize,
+                   use_cache=not args.no_cache, clear_cache=args.clear_cache,
+                   history=not args.no_history, pdf=args.pdf, bundle=args.bundle)
+
+    def run(input_csv: Path | None = None) -> RunReport:
+        return build_all(input_csv=input_csv, **options)
+
+    if args.command == "watch":
+        from watch import watch
+        watch(run, search_dirs(), Path("Customer_Statements").resolve(),
+              interval=args.interval, settle=args.settle, max_builds=args.max_builds)
+        return
+    if args.command == "batch":
+        from batch import load_jobs, run_batch
+        jobs = load_jobs(args.jobs)
+        processes = args.processes or min(len(jobs), os.cpu_count() or 1)
+        run_batch(jobs, args.summary_root, processes, **options)
+        return
 
-    print(f"✅ Built {len(summaries)} statements into {base_root}")
-    print(f"   Open: {(base_root / 'index.html')}")
+    if not args.profile:
+        run()
+        return
+    import cProfile
+    import pstats
+    prof = cProfile.Profile()
+    prof.runcall(run)
+    prof.dump_stats(args.profile)
+    pstats.Stats(prof).sort_stats("cumulative").print_stats(15)
+    print(f"   Profile: {args.profile.resolve()} (open with: python -m pstats {args.profile})")
 
 
 if __name__ == "__main__":
-    build_all()
+    main()
@@ -45,15 +45,7 @@ INDEX_HTML = """<!doctype html>
           <th>Statement</th>
         </tr>
       </thead>
-      <tbody id="rows">
-      {% for row in rows %}
-        <tr>
-          <td>{{ row.customer }}</td>
-          <td class="text-end">{{ row.total_due_fmt }}</td>
-          <td><a class="link-primary" href="{{ row.rel_path }}">Open statement</a></td>
-        </tr>
-      {% endfor %}
-      </tbody>
+      <tbody id="rows"></tbody>
       <tfoot class="table-group-divider">
         <tr>
           <td>Grand Total</td>
@@ -64,16 +56,66 @@ INDEX_HTML = """<!doctype html>
     </table>
   </div>
 
+  <div class="d-flex align-items-center gap-2">
+    <button id="prev" class="btn btn-sm btn-outline-secondary" type="button">&lsaquo; Prev</button>
+    <button id="next" class="btn btn-sm btn-outline-secondary" type="button">Next &rsaquo;</button>
+    <span id="page-info" class="text-muted small"></span>
+  </div>
+
+<!-- Customer rows live in a compact data file (columnar: c=customer, t=total due, p=statement path) -->
+<script src="{{ data_src }}"></script>
 <script>
-// Simple client-side filter (kept)
+const D = window.INDEX_DATA || {c: [], t: [], p: []};
+const PAGE_SIZE = {{ page_size }};
+// Lowercased "customer \u0001 amount" per row, built once; searches never touch the DOM
+const KEYS = D.c.map((c, i) => (c + "\u0001" + D.t[i]).toLowerCase());
+let hits = null, page = 0, timer = null;  // hits = matching row numbers (null = all rows)
+
+function render(){
+  const n = hits ? hits.length : D.c.length;
+  const pages = Math.max(1, Math.ceil(n / PAGE_SIZE));
+  page = Math.min(page, pages - 1);
+  const from = page * PAGE_SIZE, to = Math.min(n, from + PAGE_SIZE);
+  const frag = document.createDocumentFragment();
+  for (let k = from; k < to; k++) {
+    const i = hits ? hits[k] : k;
+    const tr = document.createElement("tr");
+    const name = tr.insertCell(), amt = tr.insertCell(), link = tr.insertCell();
+    name.textContent = D.c[i];
+    amt.textContent = D.t[i];
+    amt.className = "text-end";
+    const a = link.appendChild(document.createElement("a"));
+    a.className = "link-primary";
+    a.href = D.p[i];
+    a.textContent = "Open statement";
+    frag.appendChild(tr);
+  }
+  document.getElementById("rows").replaceChildren(frag);
+  document.getElementById("page-info").textContent = n ? `${from + 1}–${to} of ${n}` : "No matches";
+  document.getElementById("prev").disabled = page === 0;
+  document.getElementById("next").disabled = page >= pages - 1;
+}
+
+function search(){
+  const q = (document.getElementById("q").value || "").toLowerCase();
+  hits = null;
+  if (q) {
+    hits = [];
+    for (let i = 0; i < KEYS.length; i++) if (KEYS[i].includes(q)) hits.push(i);
+  }
+  page = 0;
+  render();
+}
+
+// Debounced client-side filter
 function filt(){
-  const q=(document.getElementById('q').value||'').toLowerCase();
-  document.querySelectorAll('#rows tr').forEach(tr=>{
-    const name = tr.children[0].innerText.toLowerCase();
-    const amt  = tr.children[1].innerText.toLowerCase();
-    tr.style.display = (name.includes(q)||amt.includes(q)) ? "" : "none";
-  });
+  clearTimeout(timer);
+  timer = setTimeout(search, 150);
 }
+
+document.getElementById("prev").onclick = () => { page--; render(); };
+document.getElementById("next").onclick = () => { page++; render(); };
+render();
 </script>
 </body>
 </html>
@@ -212,3 +254,92 @@ Thanks,
 Accounts Receivable
 {{ company.name }}
 """
+
+# Consolidated index of a multi-entity batch run (batch.py): one row per entity, links to its own index
+BATCH_INDEX_HTML = """<!doctype html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Customer Statements - All Entities - {{ as_of }}</title>
+<link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css" rel="stylesheet"
+      integrity="sha384-QWTKZyjpPEjISv5WaRU9OFeRpok6YctnYmDr5pNlyT2bRjXh0JMhjY6hW+ALEwIH" crossorigin="anonymous">
+<style>
+  body { margin: 24px; }
+  .sticky-th th { position: sticky; top: 0; background: #f8f9fa; z-index: 1; }
+</style>
+</head>
+<body class="container-xl">
+  <header class="mb-3">
+    <h1 class="h3 mb-1">Customer Statements - All Entities</h1>
+    <span class="badge text-bg-light">As of {{ as_of }}</span>
+    <span class="badge text-bg-light">{{ entities|length }} entities</span>
+  </header>
+
+  <div class="table-responsive">
+    <table class="table table-sm table-striped align-middle">
+      <thead class="sticky-th">
+        <tr>
+          <th>Entity</th>
+          <th class="text-end">Customers</th>
+          {% for b in buckets %}<th class="text-end">{{ b }}</th>{% endfor %}
+          <th class="text-end">Total Due</th>
+          <th class="text-end">Overdue</th>
+          <th class="text-end">Build</th>
+          <th>Statements</th>
+        </tr>
+      </thead>
+      <tbody>
+        {% for e in entities %}
+        <tr>
+          <td>{{ e.entity }}<div class="text-muted small">{{ e.company }}</div></td>
+          {% if e.ok %}
+          <td class="text-end">{{ e.customers }}</td>
+          {% for b in buckets %}<td class="text-end">{{ e.totals_fmt[b] }}</td>{% endfor %}
+          <td class="text-end fw-semibold">{{ e.totals_fmt["Total Due"] }}</td>
+          <td class="text-end">{{ e.totals_fmt["Overdue Total"] }}</td>
+          <td class="text-end">{{ "%.1f"|format(e.seconds) }}s</td>
+          <td><a href="{{ e.link }}">Open</a></td>
+          {% else %}
+          <td colspan="{{ buckets|length + 4 }}" class="text-danger">Build failed: {{ e.error }}</td>
+          <td class="text-end">{{ "%.1f"|format(e.seconds) }}s</td>
+          {% endif %}
+        </tr>
+        {% endfor %}
+      </tbody>
+      <tfoot class="table-group-divider">
+        <tr class="fw-semibold">
+          <td>All entities</td>
+          <td class="text-end">{{ grand.customers }}</td>
+          {% for b in buckets %}<td class="text-end">{{ grand.totals_fmt[b] }}</td>{% endfor %}
+          <td class="text-end">{{ grand.totals_fmt["Total Due"] }}</td>
+          <td class="text-end">{{ grand.totals_fmt["Overdue Total"] }}</td>
+          <td class="text-end">{{ "%.1f"|format(grand.seconds) }}s</td>
+          <td></td>
+        </tr>
+      </tfoot>
+    </table>
+  </div>
+</body>
+</html>
+"""
+
+# Print stylesheet for PDF statements (pdf.py): an offline stand-in for the Bootstrap classes
+# STATEMENT_HTML uses, since the PDF renderer never fetches the CDN stylesheet.
+PDF_CSS = """
+@page { size: Letter; margin: 14mm 12mm; @bottom-right { content: counter(page) " / " counter(pages); font-size: 8pt; color: #6c757d; } }
+body { margin: 0; font-family: "Helvetica Neue", Arial, sans-serif; font-size: 9.5pt; color: #212529; line-height: 1.35; }
+h1, h2 { margin: 0; font-weight: 600; }
+.h3 { font-size: 15pt; } .h5 { font-size: 12pt; } .h6 { font-size: 10.5pt; }
+.mb-1 { margin-bottom: 2mm; } .mb-2 { margin-bottom: 3mm; } .mb-3 { margin-bottom: 5mm; } .mt-2 { margin-top: 3mm; }
+.d-flex { display: flex; } .align-items-center { align-items: center; } .gap-3 { gap: 5mm; }
+.small { font-size: 8pt; } .text-muted { color: #6c757d; } .fw-semibold { font-weight: 600; }
+.text-end { text-align: right; } .text-center { text-align: center; }
+.badge { display: inline-block; padding: 1mm 2mm; border: 0.5pt solid #dee2e6; border-radius: 1mm; font-size: 8pt; }
+.card { border: 0.5pt solid #dee2e6; border-radius: 1.5mm; } .card-body { padding: 4mm; }
+.btn { display: none; }
+.table { width: 100%; border-collapse: collapse; }
+.table th, .table td { padding: 1mm 1.5mm; border-bottom: 0.5pt solid #dee2e6; vertical-align: middle; }
+.table thead { display: table-header-group; } .table tr { page-break-inside: avoid; }
+.table-striped tbody tr:nth-child(odd) td { background: #f6f7f8; }
+.table-group-divider, tfoot { border-top: 1pt solid #212529; }
+"""
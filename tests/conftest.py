@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The project is a flat set of modules; make them importable from tests/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,87 @@
+"""
+End to end: every build mode writes the same statements, email templates and _rejected_rows.csv
+as a plain serial build (parallel render, chunked reads with a spill/resplit, a cache hit, incremental reruns),
+and the Arrow reader treats the same cells as missing as pandas does.
+"""
+from pathlib import Path
+
+import pytest
+
+import statements
+from bench import make_export
+
+
+def _build(export: Path, root: Path, **options) -> statements.RunReport:
+    options = {"history": False, "use_cache": False, **options}
+    return statements.build_all(input_csv=export, output_root=root, **options)
+
+
+def _outputs(root: Path) -> dict[str, bytes]:
+    """Relative path -> bytes of every statement, email template and the rejected rows."""
+    files = [root / "_rejected_rows.csv", *root.glob("*/*.html"), *root.glob("*/email_template.txt")]
+    return {p.relative_to(root).as_posix(): p.read_bytes() for p in files}
+
+
+@pytest.fixture(scope="module")
+def export(tmp_path_factory) -> Path:
+    return make_export(tmp_path_factory.mktemp("export") / "qb_ar_aging_detail.csv", rows=2000, customers=60)
+
+
+@pytest.fixture(scope="module")
+def baseline(export, tmp_path_factory) -> dict[str, bytes]:
+    root = tmp_path_factory.mktemp("serial") / "Customer_Statements"
+    _build(export, root)
+    files = _outputs(root)
+    assert sum(name.endswith(".html") for name in files) == 60
+    return files
+
+
+def test_parallel_render(export, baseline, tmp_path):
+    _build(export, tmp_path / "out", workers=4)
+    assert _outputs(tmp_path / "out") == baseline
+
+
+def test_chunked_with_spill_and_resplit(export, baseline, tmp_path, monkeypatch):
+    monkeypatch.setattr(statements, "SPILL_ROWS", 10)  # 1,800 spilled rows > 10 x SPILL_PARTS: re-split
+    report = _build(export, tmp_path / "out", chunksize=100)
+    assert {"spill", "resplit"} <= report.phases.keys()
+    assert _outputs(tmp_path / "out") == baseline
+
+
+def test_cache_hit(export, baseline, tmp_path):
+    root = tmp_path / "out"
+    _build(export, root, use_cache=True)
+    for path in root.glob("*/*.html"):
+        path.unlink()
+    (root / "_rejected_rows.csv").unlink()
+    report = _build(export, root, use_cache=True)
+    assert "read" not in report.phases  # served from the normalized snapshot
+    assert _outputs(root) == baseline
+
+
+def test_incremental_rerun(export, baseline, tmp_path):
+    root = tmp_path / "out"
+    _build(export, root)
+    assert _build(export, root).counts["rebuilt"] == 0
+    assert _outputs(root) == baseline
+
+    # Drop every 25th line: some customers change, the rest are skipped
+    lines = export.read_text(encoding="utf-8").splitlines(keepends=True)
+    changed = tmp_path / "changed.csv"
+    changed.write_text("".join(line for i, line in enumerate(lines) if i % 25 != 1), encoding="utf-8")
+    report = _build(changed, root)
+    assert 0 < report.counts["rebuilt"] < report.counts["customers"]
+    _build(changed, tmp_path / "fresh")
+    assert _outputs(root) == _outputs(tmp_path / "fresh")
+
+
+@pytest.mark.skipif(statements.pa is None, reason="needs pyarrow")
+def test_arrow_reader_matches_pandas_missing_cells(tmp_path):
+    cells = [*statements.NA_STRINGS, "N.A.", "none", "-", "0", " NA "]
+    path = tmp_path / "na.csv"
+    path.write_text("Name,Open Balance\n" + "".join(f'"{c}",x\n' for c in cells), encoding="utf-8")
+    names, usecols = ["Name", "Open Balance"], ["Name"]
+    arrow = statements._arrow_frame(path, names, usecols)
+    pandas = statements._read_csv(path)[usecols]
+    assert arrow["Name"].isna().tolist() == pandas["Name"].isna().tolist()
+    assert arrow["Name"].isna().sum() == len(statements.NA_STRINGS)
@@ -0,0 +1,114 @@
+"""
+Sending against the local stand-in server: retries on 451s, the send log, resume, and connection reuse.
+"""
+import json
+import random
+import smtplib
+import socket
+import threading
+import time
+
+import pytest
+
+import statements
+from bench import make_export
+from config import Mail
+from invoice_index import INDEX_DB_NAME, InvoiceIndex
+from mailer import (SEND_LOG_NAME, SendLog, SmtpPool, StandInSMTPServer, _permanent, build_outbox, dispatch,
+                    load_contacts, send_outbox)
+
+
+@pytest.fixture
+def server():
+    srv = StandInSMTPServer(port=0, fail_rate=0.3)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture(scope="module")
+def build(tmp_path_factory):
+    """A small build plus a contacts file covering every customer."""
+    tmp = tmp_path_factory.mktemp("mail")
+    root = tmp / "Customer_Statements"
+    statements.build_all(input_csv=make_export(tmp / "export.csv", rows=300, customers=12),
+                         output_root=root, history=False, use_cache=False)
+    customers = InvoiceIndex(root / INDEX_DB_NAME).customers()
+    contacts = tmp / "customer_emails.csv"
+    contacts.write_text("Customer,Email\n" + "".join(f'"{c}",ar{i}@example.com\n' for i, c in enumerate(customers)),
+                        encoding="utf-8")
+    return root, contacts
+
+
+def _mail(srv: StandInSMTPServer, contacts, **kw) -> Mail:
+    return Mail(host="127.0.0.1", port=srv.server_address[1], contacts_csv=contacts, connections=1,
+                rate_per_sec=0, max_retries=8, backoff_s=0.001, timeout_s=5, **kw)
+
+
+def test_send_retries_logs_and_resumes(server, build):
+    root, contacts = build
+    (root / SEND_LOG_NAME).unlink(missing_ok=True)
+    random.seed(1)  # the stand-in's 451s
+    mail = _mail(server, contacts)
+
+    first = dispatch(root, mail, limit=5).counts
+    assert first["sent"] == 5 and first["failed"] == 0 and first["no_contact_or_statement"] == 0
+    log = [json.loads(line) for line in (root / SEND_LOG_NAME).read_text(encoding="utf-8").splitlines()]
+    assert [e["status"] for e in log] == ["sent"] * 5
+    assert sum(e["attempts"] - 1 for e in log) == first["retries"]
+
+    second = dispatch(root, mail).counts
+    assert second["already_sent"] == 5
+    assert second["sent"] == 7
+    assert first["retries"] + second["retries"] > 0
+    assert len(SendLog(root / SEND_LOG_NAME).sent_keys()) == 12
+    assert server.received == 12
+
+
+def test_send_outbox_gives_up_after_max_retries(server, build):
+    root, contacts = build
+    server.fail_rate = 1.0
+    items = build_outbox(root, load_contacts(contacts))[0][:2]
+    log = SendLog(root.parent / "failing_send_log.jsonl")
+    counts = send_outbox(items, _mail(server, contacts), log)
+    assert counts["failed"] == 2 and counts["sent"] == 0 and counts["retries"] == 2 * 8
+    assert counts["connections_opened"] == 1  # 451s leave the session usable
+    assert not log.sent_keys()
+
+
+def test_pool_drops_connection_closed_by_421():
+    pool = SmtpPool(Mail(), 1)
+    pool._idle.put(smtplib.SMTP())  # unconnected: sock is None, as after smtplib handles a 421
+    with pytest.raises(smtplib.SMTPSenderRefused):
+        with pool.connection():
+            raise smtplib.SMTPSenderRefused(421, b"closing", "ar@example.com")
+    assert pool._idle.empty()
+
+
+@pytest.mark.parametrize("codes, permanent", [([550], True), ([550, 553], True), ([421], False), ([550, 451], False)])
+def test_refused_recipients_classified_by_code(codes, permanent):
+    err = smtplib.SMTPRecipientsRefused({f"r{i}@example.com": (c, b"") for i, c in enumerate(codes)})
+    assert _permanent(err) is permanent
+
+
+def test_stand_in_handler_ends_when_client_drops_mid_message(server):
+    def handlers() -> int:
+        return sum("process_request" in t.name for t in threading.enumerate())
+
+    with socket.create_connection(server.server_address) as s:
+        f = s.makefile("rb")
+        f.readline()  # greeting
+        for cmd, replies in ((b"EHLO t", 2), (b"MAIL FROM:<a@example.com>", 1), (b"RCPT TO:<b@example.com>", 1),
+                             (b"DATA", 1)):
+            s.sendall(cmd + b"\r\n")
+            for _ in range(replies):
+                f.readline()
+        s.sendall(b"Subject: cut off\r\n")
+        s.shutdown(socket.SHUT_WR)  # EOF before the terminating "."
+        deadline = time.monotonic() + 5
+        while handlers() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert handlers() == 0
+        assert f.read() == b""  # nothing queued
@@ -0,0 +1,76 @@
+"""
+Scalar helpers vs their vectorized *_series forms: both must agree cell for cell,
+on the QuickBooks values the export actually contains.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import bucketize, bucketize_series, clean_str, clean_str_series, parse_money, parse_money_series
+
+MONEY = [
+    ("$1,234.00", 1234.0),
+    ("1,000", 1000.0),
+    ("-45.5", -45.5),
+    ("$-3.10", -3.1),
+    (7, 7.0),
+    ("(12.50)", math.nan),  # accounting negatives aren't parsed (same as the original float())
+    ("", math.nan),
+    ("  ", math.nan),
+    (None, math.nan),
+    (np.nan, math.nan),
+    ("abc", math.nan),
+]
+DAYS = [
+    (None, "Current"), (np.nan, "Current"), (-5, "Current"), (0, "Current"),
+    (1, "1-30"), (30, "1-30"), (31, "31-60"), (60.5, "31-60"), ("45", "31-60"),
+    (90, "61-90"), (91, "91-120"), (120, "91-120"), (121, "120+"), (10**9, "120+"),
+]
+TEXT = [(" a ", "a"), ("x\t", "x"), ("", ""), (None, ""), (np.nan, ""), (12, "12"), (1.5, "1.5")]
+
+
+def _same(a, b) -> bool:
+    return (pd.isna(a) and pd.isna(b)) or a == b
+
+
+@pytest.mark.parametrize("value, expected", MONEY)
+def test_parse_money(value, expected):
+    assert _same(parse_money(value), expected)
+
+
+def test_parse_money_series_matches_scalar():
+    values = pd.Series([v for v, _ in MONEY], dtype=object)
+    out = parse_money_series(values)
+    assert out.dtype == "float64"
+    assert all(_same(a, parse_money(v)) for a, v in zip(out.tolist(), values))
+
+
+@pytest.mark.parametrize("value", ["inf", "-inf", "1_000"])
+def test_parse_money_plain_decimals_only(value):
+    # Deliberate change: the original float() parse gave inf, -inf and 1000 here; no export balance means that
+    assert math.isnan(parse_money(value))
+    assert parse_money_series(pd.Series([value])).isna().all()
+
+
+@pytest.mark.parametrize("days, expected", DAYS)
+def test_bucketize(days, expected):
+    assert bucketize(days) == expected
+
+
+def test_bucketize_series_matches_scalar():
+    values = pd.Series([d for d, _ in DAYS], dtype=object, index=range(10, 10 + len(DAYS)))
+    out = bucketize_series(values)
+    assert out.index.equals(values.index)
+    assert out.tolist() == [bucketize(d) for d in values]
+
+
+@pytest.mark.parametrize("value, expected", TEXT)
+def test_clean_str(value, expected):
+    assert clean_str(value) == expected
+
+
+def test_clean_str_series_matches_scalar():
+    values = pd.Series([v for v, _ in TEXT], dtype=object)
+    assert clean_str_series(values).tolist() == [clean_str(v) for v in values]
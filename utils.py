@@ -2,6 +2,8 @@
 Helpers: parsing, aliases, bucket calc, file finding, slugging.
 """
 import re
+from datetime import datetime
+from importlib.util import find_spec
 from pathlib import Path
 
 import numpy as np
@@ -15,21 +17,54 @@ _re_bad = re.compile(r"[^A-Za-z0-9. -]+")
 _re_quotes = re.compile(r"[’'`]")
 
 
+_re_money_junk = re.compile(r"[,$]")
+# A plain decimal once '$' and ',' are gone (ASCII digits only, so Arrow and Python regexes agree)
+_re_decimal = re.compile(r"[+-]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?")
+# String dtype for parsing: Arrow-backed (compute kernels) when pyarrow is installed
+_TEXT_DTYPE = "string[pyarrow]" if find_spec("pyarrow") else "string"
+
+# Export date formats, tried in order against a column's first value (QuickBooks writes the first)
+DATE_FORMATS = ("%m/%d/%Y", "%m/%d/%y", "%Y-%m-%d", "%d/%m/%Y", "%m-%d-%Y", "%d-%b-%Y")
+
+
+def clean_str_series(values: pd.Series) -> pd.Series:
+    """Vectorized clean_str: NaN/None -> '', everything else str + strip."""
+    return values.astype(object).fillna("").astype(str).str.strip()
+
+
 def clean_str(x):
-    if x is None: return ""
-    # handles pandas NaN too
-    if isinstance(x, float) and pd.isna(x): return ""
-    return str(x).strip()
+    return "" if pd.isna(x) else str(x).strip()
+
+
+def parse_money_series(values: pd.Series) -> pd.Series:
+    """Vectorized parse_money: drop '$' and ',' then parse plain decimals only.
+    Anything else ('(12.50)', 'inf', text) -> NaN."""
+    text = values.astype(_TEXT_DTYPE).str.replace(_re_money_junk.pattern, "", regex=True).str.strip()
+    ok = text.str.fullmatch(_re_decimal.pattern).fillna(False).astype(bool)
+    return text.where(ok).astype(float)
 
 
 def parse_money(x):
-    if pd.isna(x): return np.nan
-    if isinstance(x, (int, float)): return float(x)
-    s = str(x).strip().replace(",", "").replace("$", "")
-    try:
-        return float(s)
-    except:
+    """One value by parse_money_series' rule."""
+    if pd.isna(x):
         return np.nan
+    text = _re_money_junk.sub("", str(x)).strip()
+    return float(text) if _re_decimal.fullmatch(text) else np.nan
+
+
+def parse_date_series(values: pd.Series) -> pd.Series:
+    """Dates parsed with one explicit format per column; unparseable -> NaT.
+    The format is the first of DATE_FORMATS that fits the column's first value
+    (columns matching none fall back to pandas' own inference)."""
+    first = values.dropna()
+    first = first.iat[0] if len(first) else None
+    for fmt in DATE_FORMATS:
+        try:
+            datetime.strptime(str(first).strip(), fmt)
+        except ValueError:
+            continue
+        return pd.to_datetime(values, format=fmt, errors="coerce")
+    return pd.to_datetime(values, errors="coerce")
 
 
 def fmt_money(x):
@@ -39,6 +74,17 @@ def fmt_money(x):
         return x
 
 
+def fmt_money_series(values: pd.Series) -> pd.Series:
+    """Column form of fmt_money for float columns (no per-cell try/except)."""
+    return pd.Series(["${:,.2f}".format(v) for v in values.astype(float).tolist()],
+                     index=values.index, dtype=object)
+
+
+def fmt_date_series(values: pd.Series) -> pd.Series:
+    """ISO date strings for a datetime column; NaT -> ''."""
+    return values.dt.strftime("%Y-%m-%d").astype(object).fillna("")
+
+
 def clean_folder_name(name: str) -> str:
     s = str(name or "")
     out = slugify(s, lowercase=False, separator=" ", max_length=120)
@@ -68,27 +114,40 @@ def pick(df: pd.DataFrame, keys: list[str]) -> str | None:
     return None
 
 
+def csv_score(name: str) -> int:
+    """How much a file name looks like an AR aging export (autodetect ranks by this, then mtime)."""
+    return sum(s in name.lower() for s in ["aging", "ar", "receivable", "qb", "ar_detail", "quickbooks"])
+
+
 def autodetect_csv(search_dirs: list[Path]) -> str | None:
     cands = []
     for d in search_dirs:
         if not d.exists(): continue
         cands += [p for p in d.glob("*.csv")]
     if not cands: return None
-    cands.sort(
-        key=lambda p: (sum(s in p.name.lower() for s in ["aging", "ar", "receivable", "qb", "ar_detail", "quickbooks"]),
-                       p.stat().st_mtime), reverse=True)
+    cands.sort(key=lambda p: (csv_score(p.name), p.stat().st_mtime), reverse=True)
     return str(cands[0])
 
 
+# Upper bounds of the bounded buckets, in order; anything past the last is the open-ended one
+_BUCKET_UPPERS = np.array([upper for _, upper in AGING_BUCKETS if upper is not None], dtype=float)
+_BUCKET_LABELS = np.array(BUCKET_CANON, dtype=object)
+
+
+def bucketize_series(days: pd.Series) -> pd.Series:
+    """Vectorized bucketize: one searchsorted over AGING_BUCKETS bounds. NaN/<=0 -> 'Current'."""
+    d = np.trunc(pd.to_numeric(days, errors="coerce").to_numpy(dtype=float, na_value=np.nan))
+    idx = np.minimum(np.searchsorted(_BUCKET_UPPERS, d, side="left"), len(BUCKET_CANON) - 1)
+    idx[np.isnan(d) | (d <= 0)] = 0
+    return pd.Series(_BUCKET_LABELS[idx], index=days.index)
+
+
 def bucketize(days: int) -> str:
-    if pd.isna(days):
-        return BUCKET_CANON[0]  # "Current"
-    d = int(days)
-    if d <= 0:
+    """One value by bucketize_series' rule."""
+    try:
+        d = np.trunc(float(days))
+    except (TypeError, ValueError):
+        return BUCKET_CANON[0]
+    if not d > 0:  # NaN too
         return BUCKET_CANON[0]
-    # Skip the first ("Current") since we've already handled <=0
-    for label, upper in AGING_BUCKETS[1:]:
-        if upper is None or d <= upper:
-            return label
-    # Fallback (shouldn't be hit, but safe):
-    return BUCKET_CANON[-1]
+    return BUCKET_CANON[min(int(np.searchsorted(_BUCKET_UPPERS, d, side="left")), len(BUCKET_CANON) - 1)]
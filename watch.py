@@ -0,0 +1,113 @@
+"""
+Watch mode: `python statements.py [build options] watch` keeps running and rebuilds the statements
+whenever a new or changed export lands where build_all looks for one (., ./input, ~/Downloads).
+
+The process keeps pandas, Jinja and the compiled templates loaded between builds. Polling is cheap:
+a folder is re-listed only when its own mtime changes, and only the CSVs already listed are stat'ed.
+An export counts as landed once it is non-empty, unchanged since the previous poll and untouched
+for --settle seconds, so a half-copied download never triggers a build.
+Each rebuild is appended to Customer_Statements/_watch_log.jsonl with its latency.
+"""
+import json
+import os
+import time
+from pathlib import Path
+from typing import Callable
+
+from utils import csv_score
+
+WATCH_LOG_NAME = "_watch_log.jsonl"
+
+
+class ExportWatcher:
+    """Cached listing of the *.csv files in search_dirs; poll() returns the export to build, if settled."""
+
+    def __init__(self, search_dirs: list[Path], settle: float = 2.0):
+        self.search_dirs = search_dirs
+        self.settle = settle
+        self._dir_mtimes: dict[Path, int] = {}
+        self._listing: dict[Path, list[Path]] = {}
+        self._last_sig: dict[Path, tuple[int, int]] = {}  # (size, mtime_ns) at the previous poll
+        self.listings = 0  # directory re-lists so far (the expensive part of a poll)
+
+    def _csvs(self) -> list[Path]:
+        found = []
+        for d in self.search_dirs:
+            try:
+                mtime = d.stat().st_mtime_ns
+            except OSError:
+                self._dir_mtimes.pop(d, None)
+                continue
+            if self._dir_mtimes.get(d) != mtime:  # entries added, removed or renamed
+                with os.scandir(d) as entries:
+                    self._listing[d] = [Path(e.path) for e in entries if e.name.endswith(".csv") and e.is_file()]
+                self._dir_mtimes[d] = mtime
+                self.listings += 1
+            found += self._listing[d]
+        return found
+
+    def poll(self) -> tuple[Path, tuple[int, int]] | None:
+        """(path, (size, mtime_ns)) of the export autodetect would pick, once it has settled; else None.
+        A better-ranked export that is still being written holds the build back instead of falling back."""
+        stats = {}
+        for p in self._csvs():
+            try:
+                st = p.stat()
+            except OSError:  # removed since the listing
+                continue
+            stats[p] = st
+        sigs = {p: (st.st_size, st.st_mtime_ns) for p, st in stats.items()}
+        prev, self._last_sig = self._last_sig, sigs
+        if not stats:
+            return None
+        best = max(stats, key=lambda p: (csv_score(p.name), stats[p].st_mtime))
+        st = stats[best]
+        if not st.st_size or prev.get(best) != sigs[best] or time.time() - st.st_mtime < self.settle:
+            return None
+        return best, sigs[best]
+
+
+def watch(build: Callable[[Path], object], search_dirs: list[Path], root: Path,
+          interval: float = 1.0, settle: float = 2.0, max_builds: int | None = None) -> None:
+    """Call build(export) for each newly settled export (and once at start) until Ctrl+C
+    or max_builds rebuilds. A failing build is logged and the export isn't retried until it changes."""
+    watcher = ExportWatcher(search_dirs, settle)
+    log_path = root / WATCH_LOG_NAME
+    last, builds = None, 0
+    print(f"👀 Watching {', '.join(str(d) for d in search_dirs if d.exists())} "
+          f"every {interval:g}s (Ctrl+C to stop)")
+    try:
+        while max_builds is None or builds < max_builds:
+            found = watcher.poll()
+            if not found or found == last:
+                time.sleep(interval)
+                continue
+            path, (size, mtime_ns) = found
+            landed = mtime_ns / 1e9
+            detected = time.time()
+            t0 = time.perf_counter()
+            error = None
+            try:
+                build(path)
+            except (SystemExit, Exception) as err:  # build_all exits on unusable exports; keep watching
+                error = f"{type(err).__name__}: {err}"
+            build_s = time.perf_counter() - t0
+            entry = {
+                "export": str(path), "bytes": size,
+                "landed": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(landed)),
+                "detect_s": round(detected - landed, 3), "build_s": round(build_s, 3),
+                "latency_s": round(time.time() - landed, 3), "ok": error is None, "error": error,
+            }
+            root.mkdir(parents=True, exist_ok=True)
+            with open(log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            timing = f"(detected +{entry['detect_s']:.1f}s, build {entry['build_s']:.1f}s)"
+            if error is None:
+                print(f"✅  {path.name}: built {entry['latency_s']:.1f}s after it landed {timing}")
+            else:
+                print(f"❌  {path.name}: build failed {timing}: {error}")
+            last = found
+            builds += 1
+    except KeyboardInterrupt:
+        pass
+    print(f"Stopped after {builds} builds ({watcher.listings} directory listings).")